@@ -1,5 +1,8 @@
+import math
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
+
+INV_SQRT_2PI = 1.0 / math.sqrt(2 * math.pi)
 
 def implied_volatility(market_price, S, K, T, r, option_type="call",
                        tol=1e-6, max_iter=100):
@@ -11,11 +14,11 @@ def implied_volatility(market_price, S, K, T, r, option_type="call",
         d2 = d1 - sigma*np.sqrt(T)
         
         if option_type == "call":
-            price = S*norm.cdf(d1) - K*np.exp(-r*T)*norm.cdf(d2)
+            price = S*ndtr(d1) - K*np.exp(-r*T)*ndtr(d2)
         else:
-            price = K*np.exp(-r*T)*norm.cdf(-d2) - S*norm.cdf(-d1)
+            price = K*np.exp(-r*T)*ndtr(-d2) - S*ndtr(-d1)
         
-        vega = S * norm.pdf(d1) * np.sqrt(T)
+        vega = S * INV_SQRT_2PI * np.exp(-0.5*d1*d1) * np.sqrt(T)
         
         diff = price - market_price
         
@@ -25,5 +28,8 @@ def implied_volatility(market_price, S, K, T, r, option_type="call",
         sigma -= diff / vega
     
     raise ValueError("IV did not converge")
-vi=implied_volatility(727.8, 22161, 22000, 31/365, 0.04, option_type="call")
-print("Implied Volatility:", vi)
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    vi=implied_volatility(727.8, 22161, 22000, 31/365, 0.04, option_type="call")
+    print("Implied Volatility:", vi)
\ No newline at end of file
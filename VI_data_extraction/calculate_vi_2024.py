@@ -1,125 +1,482 @@
 """
-Calculate Implied Volatility (IV) for 2024 F&O data from master_fo_data.csv
-Uses VECTORIZED Newton-Raphson Black-Scholes IV solver for speed.
-Saves result as vi_data_historical.csv in VI_data_extraction folder.
+Calculate Implied Volatility (IV) for 2024 F&O data from master_fo_data.parquet
+(master_fo_data.csv if absent)
+Seeds each row with a closed-form IV guess (or the contract's previous-day
+IV), refines it with Householder steps in a per-row Numba kernel when numba
+is installed (VECTORIZED NumPy solver otherwise), and rescues any rows the
+iteration gives up on with a vectorized Chandrupatla bracketing solve.
+Saves result as vi_data_historical.parquet (plus a CSV copy for the
+backtests) in VI_data_extraction folder.
 """
 
 import os
+import math
 import numpy as np
 import pandas as pd
-from scipy.stats import norm
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+from scipy.special import ndtr
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
 
 # ── Configuration ───────────────────────────────────────────────────────────
 
-INPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "master", "master_fo_data.csv")
+MASTER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "master")
+INPUT_FILE = os.path.join(MASTER_DIR, "master_fo_data.parquet")
+INPUT_CSV_FILE = os.path.join(MASTER_DIR, "master_fo_data.csv")
 OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "vi_data_historical.csv")
+OUTPUT_FILE = os.path.join(OUTPUT_DIR, "vi_data_historical.parquet")
+# backtesting/utils.py still loads the CSV export
+OUTPUT_CSV_FILE = os.path.join(OUTPUT_DIR, "vi_data_historical.csv")
+
+TARGET_YEAR = 2026
+
+# Set VI_VERBOSE=1 to print sample rows and IV statistics after the run
+VERBOSE = os.getenv("VI_VERBOSE") == "1"
+# Decimals kept in the CSV export; T and VI otherwise print 8-17 digits
+CSV_DECIMALS = {"T": 6, "VI": 6}
+
+# Only these master columns are parsed; everything else is skipped by the reader
+INPUT_COLUMNS = {
+    "TradDt": pa.date32(),
+    "XpryDt": pa.date32(),
+    "TckrSymb": pa.string(),
+    "OptnTp": pa.string(),
+    "StrkPric": pa.float64(),
+    "UndrlygPric": pa.float64(),
+    "ClsPric": pa.float64(),
+}
+CSV_BLOCK_SIZE = 64 << 20  # bytes per streamed record batch
+PARQUET_BATCH_ROWS = 1 << 20  # rows per streamed Parquet record batch
 
 RISK_FREE_RATE = 0.065  # ~6.5% India 10yr bond yield
+SIGMA_INIT = 0.3        # guess when no prior IV or closed-form seed is usable
+IV_LOWER = 1e-4         # Chandrupatla fallback bracket
+IV_UPPER = 5.0
+IV_TOL = 1e-6           # absolute price tolerance at convergence
+IV_XTOL = 1e-6          # ... together with a sigma step (or bracket width) below this
+IV_BLOCK_ROWS = 1 << 18 # rows per vectorized solve (2 MB per float64 array)
 
+# A contract's IV surface is tracked along these keys, in TradDt order
+CONTRACT_KEYS = ["TckrSymb", "XpryDt", "StrkPric", "OptnTp"]
 
-# ── Vectorized IV Solver ────────────────────────────────────────────────────
-
-def vectorized_iv(market_price, S, K, T, r, is_call, tol=1e-6, max_iter=100):
-    """
-    Vectorized Newton-Raphson implied volatility solver.
-    All inputs are numpy arrays of the same length.
-    Returns numpy array of IV values (NaN where it fails).
-    """
-    n = len(market_price)
-    sigma = np.full(n, 0.3)  # initial guess
-    result = np.full(n, np.nan)
+INV_SQRT_2PI = 1.0 / math.sqrt(2 * math.pi)
+INV_SQRT_2 = 1.0 / math.sqrt(2)
 
-    # Mask for valid rows that are still being iterated
-    active = np.ones(n, dtype=bool)
 
-    for iteration in range(max_iter):
-        if not active.any():
-            break
+# ── Data Loading ────────────────────────────────────────────────────────────
 
-        s = sigma[active]
-        mp = market_price[active]
-        s_price = S[active]
-        k = K[active]
-        t = T[active]
-        call = is_call[active]
+def load_option_rows(path, year):
+    """
+    Stream the master Parquet (or CSV) file with pyarrow, reading only
+    INPUT_COLUMNS and keeping, batch by batch, only CE/PE rows traded in
+    `year`. Returns (DataFrame, total rows read).
+    """
+    schema = pa.schema(list(INPUT_COLUMNS.items()))
+    if path.endswith(".parquet"):
+        # Cast to INPUT_COLUMNS: the Parquet copy stores dates as timestamps
+        reader = (pa.RecordBatch.from_arrays([pc.cast(b[c], t) for c, t in INPUT_COLUMNS.items()],
+                                             schema=schema)
+                  for b in pq.ParquetFile(path).iter_batches(batch_size=PARQUET_BATCH_ROWS,
+                                                             columns=list(INPUT_COLUMNS)))
+    else:
+        reader = pv.open_csv(
+            path,
+            read_options=pv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+            convert_options=pv.ConvertOptions(include_columns=list(INPUT_COLUMNS),
+                                              column_types=INPUT_COLUMNS),
+        )
+    option_types = pa.array(["CE", "PE"])
+    batches = []
+    total = 0
+    for batch in reader:
+        total += batch.num_rows
+        keep = pc.and_(pc.equal(pc.year(batch["TradDt"]), year),
+                       pc.is_in(batch["OptnTp"], value_set=option_types))
+        batches.append(batch.filter(keep))
+
+    table = pa.Table.from_batches(batches, schema=schema)
+    return table.to_pandas(date_as_object=False), total
 
-        sqrt_t = np.sqrt(t)
-        d1 = (np.log(s_price / k) + (r + 0.5 * s ** 2) * t) / (s * sqrt_t)
-        d2 = d1 - s * sqrt_t
 
-        # Black-Scholes price
-        call_price = s_price * norm.cdf(d1) - k * np.exp(-r * t) * norm.cdf(d2)
-        put_price = k * np.exp(-r * t) * norm.cdf(-d2) - s_price * norm.cdf(-d1)
-        bs_price = np.where(call, call_price, put_price)
+# ── Vectorized IV Solver ────────────────────────────────────────────────────
 
-        # Vega
-        vega = s_price * norm.pdf(d1) * sqrt_t
+def bs_price(sigma, S, K, T, r, theta):
+    """Black-Scholes price; theta = +1 for calls, -1 for puts."""
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    return theta * (S * ndtr(theta * d1) - K * np.exp(-r * T) * ndtr(theta * d2))
 
-        diff = bs_price - mp
 
-        # Converged
-        converged = np.abs(diff) < tol
-        # Bad vega
-        bad_vega = vega < 1e-12
+def closed_form_iv_guess(market_price, S, K, T, r, is_call):
+    """
+    Explicit IV approximation built on Polya's bound for N(x)
+    (Stefanica & Radoicic), used to seed the root finders.
 
-        # Get indices in the full array
-        active_indices = np.where(active)[0]
+    Works in normalised units c = C/S, x = ln(S*e^(rT)/K). Puts are mapped
+    to calls by put-call parity and in-the-money calls to the equivalent
+    out-of-the-money call at -x (same sigma), leaving a quadratic in the
+    Polya term. Returns SIGMA_INIT where the approximation is undefined.
+    """
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        x = np.log(S / K) + r * T
+        c = market_price / S
+        c = np.where(is_call, c, c + 1.0 - np.exp(-x))
+        c = np.where(x > 0, 1.0 - np.exp(x) * (1.0 - c), c)
+        x = -np.abs(x)
+
+        y = 2.0 * c - 1.0 + np.exp(-x)
+        alpha = 1.0 - np.exp((4.0 / np.pi - 2.0) * x)
+        gamma = y * y - np.exp(-2.0 * x) * (1.0 - np.exp(4.0 * x / np.pi))
+        # Smaller root of alpha*p^2 - 2*y*p + gamma = 0, rationalised so it stays finite at x = 0
+        p = gamma / (y + np.sqrt(y * y - alpha * gamma))
+        d1 = np.sign(p) * np.sqrt(-0.5 * np.pi * np.log1p(-p * p))
+        sigma0 = (d1 + np.sqrt(d1 * d1 - 2.0 * x)) / np.sqrt(T)
+
+        ok = (c > 0) & (np.abs(p) < 1) & (y >= p) & (sigma0 > 0) & (sigma0 < 10)
+    return np.where(ok, sigma0, SIGMA_INIT)
+
+
+def chandrupatla_iv(market_price, S, K, T, r, is_call, lo=IV_LOWER, hi=IV_UPPER,
+                    xtol=IV_XTOL, n_iter=30):
+    """
+    Vectorized Chandrupatla root finder on BS(sigma) - market_price, used
+    as a safety net for rows the Householder solvers give up on (tiny vega
+    deep ITM/OTM, overshoot). Each step is inverse quadratic interpolation
+    when the bracket allows it and bisection otherwise. Black-Scholes is
+    monotone in sigma, so every row with a root in [lo, hi] converges; all
+    rows advance in lockstep under masks.
+    Looser than compute_greeks.solve_iv_vectorized (1e-8 / 100, kept at
+    brentq parity): VI only feeds ATM filtering and the backtests, where
+    1e-6 in sigma is far below quote noise, and 30 steps cover even pure
+    bisection from [lo, hi] to xtol (23 halvings).
+    Returns numpy array of IV values (NaN where there is no root).
+    """
+    n = len(market_price)
+    eps = np.finfo(np.float64).eps
+    theta = np.where(is_call, 1.0, -1.0)
+
+    # x1 is the newest point, [x1, x2] brackets the root, x3 is the previous x1 or x2
+    x1 = np.full(n, lo)
+    x2 = np.full(n, hi)
+    f1 = bs_price(x1, S, K, T, r, theta) - market_price
+    f2 = bs_price(x2, S, K, T, r, theta) - market_price
+    x3, f3 = x2.copy(), f2.copy()
+    has_root = (f1 <= 0) & (f2 >= 0)
+    done = ~has_root
+    t = np.full(n, 0.5)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(n_iter):
+            xt = x1 + t * (x2 - x1)
+            ft = bs_price(xt, S, K, T, r, theta) - market_price
+
+            # Keep the root bracketed: xt replaces x1 if f has the same sign there, else x2 <- x1
+            same = np.sign(ft) == np.sign(f1)
+            live = ~done
+            x3 = np.where(live, np.where(same, x1, x2), x3)
+            f3 = np.where(live, np.where(same, f1, f2), f3)
+            x2 = np.where(live & ~same, x1, x2)
+            f2 = np.where(live & ~same, f1, f2)
+            x1 = np.where(live, xt, x1)
+            f1 = np.where(live, ft, f1)
+
+            use_x1 = np.abs(f1) < np.abs(f2)
+            xm = np.where(use_x1, x1, x2)
+            fm = np.where(use_x1, f1, f2)
+            tlim = (2 * eps * np.abs(xm) + xtol) / np.abs(x2 - x1)
+            done |= (tlim > 0.5) | (fm == 0)
+            if done.all():
+                break
+
+            # Inverse quadratic interpolation only where it stays inside the bracket
+            xi = (x1 - x2) / (x3 - x2)
+            phi = (f1 - f2) / (f3 - f2)
+            iqi = (1 - np.sqrt(1 - xi) < phi) & (phi < np.sqrt(xi))
+            t_iqi = (f1 / (f2 - f1) * f3 / (f2 - f3)
+                     + (x3 - x1) / (x2 - x1) * f1 / (f3 - f1) * f2 / (f3 - f2))
+            t = np.clip(np.where(iqi, t_iqi, 0.5), tlim, 1 - tlim)
+
+    return np.where(has_root, np.where(np.abs(f1) < np.abs(f2), x1, x2), np.nan)
+
+
+def vectorized_iv(market_price, S, K, T, r, is_call, sigma0=None, tol=IV_TOL, xtol=IV_XTOL,
+                  max_iter=20, block_size=IV_BLOCK_ROWS):
+    """
+    Vectorized Householder (Halley) implied volatility solver.
+    Steps on log(BS(sigma)) - log(market_price) (Jaeckel), which is far
+    better behaved than the raw price residual. A row converges only once
+    its price matches to tol (absolute) and its next step is below xtol, so
+    a price that barely depends on sigma (deep ITM) can't stop the
+    iteration at whatever sigma it was seeded with.
+    All inputs are float64 numpy arrays of the same length.
+    sigma0 is an optional per-row initial guess (defaults to SIGMA_INIT).
+    Returns numpy array of IV values (NaN where it fails).
 
-        # Mark converged
-        converged_idx = active_indices[converged]
-        result[converged_idx] = sigma[converged_idx]
+    Every iteration runs over all rows into preallocated buffers; finished
+    rows are frozen with a mask instead of being compacted out. Once fewer
+    than a quarter of the rows are still active, they are gathered once and
+    solved by a recursive call, so the convergence tail stays cheap.
+    Inputs longer than block_size are solved block by block, so a block's
+    arrays stay cache-resident across all of its iterations.
+    """
+    n = len(market_price)
+    if n > block_size:
+        out = np.empty(n)
+        for lo in range(0, n, block_size):
+            blk = slice(lo, lo + block_size)
+            out[blk] = vectorized_iv(market_price[blk], S[blk], K[blk], T[blk], r, is_call[blk],
+                                     sigma0=None if sigma0 is None else sigma0[blk],
+                                     tol=tol, xtol=xtol, max_iter=max_iter, block_size=block_size)
+        return out
+
+    if sigma0 is None:
+        sigma = np.full(n, SIGMA_INIT)
+    else:
+        sigma = np.array(sigma0, dtype=np.float64)
+
+    # Loop invariants; theta = +1 for calls, -1 for puts (single-formula Black-Scholes)
+    theta = np.where(is_call, 1.0, -1.0)
+    sqrt_t = np.sqrt(T)
+    rt = r * T
+    log_fwd = np.log(S / K) + rt  # log(S/K) + rT
+    k_disc = K * np.exp(-rt)
+    vega_scale = S * sqrt_t * INV_SQRT_2PI
+    log_mp = np.log(market_price)
+
+    converged = np.zeros(n, dtype=bool)
+    done = np.zeros(n, dtype=bool)  # converged or given up
+
+    vol_t = np.empty(n)
+    d1 = np.empty(n)
+    d2 = np.empty(n)
+    buf = np.empty(n)
+    bs_price = np.empty(n)
+    vega = np.empty(n)
+    diff = np.empty(n)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for iteration in range(max_iter):
+            left = np.flatnonzero(~done)
+            if len(left) == 0:
+                break
+            if 4 * len(left) < n:
+                tail = vectorized_iv(market_price[left], S[left], K[left], T[left], r, is_call[left],
+                                     sigma0=sigma[left], tol=tol, xtol=xtol,
+                                     max_iter=max_iter - iteration)
+                sigma[left] = tail
+                converged[left] = np.isfinite(tail)
+                break
+
+            # d1 = (log(S/K) + (r + sigma^2/2) T) / (sigma sqrt(T)), d2 = d1 - sigma sqrt(T)
+            np.multiply(sigma, sqrt_t, out=vol_t)
+            np.multiply(sigma, sigma, out=d1)
+            d1 *= 0.5
+            d1 *= T
+            d1 += log_fwd
+            d1 /= vol_t
+            np.subtract(d1, vol_t, out=d2)
+
+            # Black-Scholes price: theta * (S*N(theta*d1) - K*e^(-rT)*N(theta*d2))
+            np.multiply(theta, d1, out=buf)
+            ndtr(buf, out=buf)
+            buf *= S
+            np.multiply(theta, d2, out=bs_price)
+            ndtr(bs_price, out=bs_price)
+            bs_price *= k_disc
+            np.subtract(buf, bs_price, out=bs_price)
+            bs_price *= theta
+
+            # Vega
+            np.multiply(d1, d1, out=vega)
+            vega *= -0.5
+            np.exp(vega, out=vega)
+            vega *= vega_scale
+
+            # Log-price residual; a non-positive price (underflow) can't be logged
+            np.log(bs_price, out=diff)
+            diff -= log_mp
+
+            # Householder(2) step on g = log(f) - log(V): g' = vega/f and
+            # g''/g'^2 = (volga/vega)*(f/vega) - 1, with volga/vega = d1*d2/sigma
+            np.divide(bs_price, vega, out=buf)
+            corr = 1.0 - 0.5 * diff * (d1 * d2 / sigma * buf - 1.0)
+            buf *= diff
+            buf /= np.maximum(corr, 0.5)
+
+            newly = ~done & (np.abs(bs_price - market_price) < tol) & (np.abs(buf) < xtol)
+            converged |= newly
+            done |= newly | (vega < 1e-12) | (bs_price <= 0)
+            if done.all():
+                break
+            np.subtract(sigma, buf, out=sigma, where=~done)
+
+            # Guard against negative or extreme sigma
+            bad_sigma = ~done & ((sigma <= 0) | (sigma > 10))
+            sigma[bad_sigma] = SIGMA_INIT
+            done |= bad_sigma
+
+    return np.where(converged, sigma, np.nan)
+
+
+def warm_start_iv(market_price, S, K, T, r, is_call, sigma_cold, group_starts):
+    """
+    Vectorized IV solve where each row is seeded with the previous trading
+    day's converged IV of the same contract (sigma_cold if there is none).
 
-        # Mark failed (bad vega but not converged)
-        failed_idx = active_indices[bad_vega & ~converged]
-        # result stays NaN for failed
+    Rows must be sorted by contract then TradDt; group_starts holds the
+    first row of every contract plus a trailing len(market_price).
+    Rows are solved one day-offset at a time, so every vectorized_iv call
+    spans all contracts and already knows the previous day's result.
+    """
+    n = len(market_price)
+    lengths = np.diff(group_starts)
+    offset = np.arange(n) - np.repeat(group_starts[:-1], lengths)
+    order = np.argsort(offset, kind="stable")
+    bounds = np.searchsorted(offset[order], np.arange(lengths.max() + 1))
 
-        # Update sigma for remaining
-        still_going = ~converged & ~bad_vega
-        update_idx = active_indices[still_going]
-        sigma[update_idx] -= diff[still_going] / vega[still_going]
+    result = np.full(n, np.nan)
+    for level, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        idx = order[lo:hi]
+        if level == 0:
+            sigma0 = sigma_cold[idx]
+        else:
+            prev = result[idx - 1]
+            sigma0 = np.where(np.isfinite(prev), prev, sigma_cold[idx])
+        result[idx] = vectorized_iv(market_price[idx], S[idx], K[idx], T[idx], r,
+                                    is_call[idx], sigma0=sigma0)
+    return result
 
-        # Guard against negative or extreme sigma
-        bad_sigma = (sigma[update_idx] <= 0) | (sigma[update_idx] > 10)
-        bad_sigma_idx = update_idx[bad_sigma]
-        sigma[bad_sigma_idx] = np.nan
 
-        # Update active mask
-        active[converged_idx] = False
-        active[failed_idx] = False
-        active[bad_sigma_idx] = False
+# ── Numba IV Kernel ─────────────────────────────────────────────────────────
 
-    return result
+def _iv_kernel(market_price, S, K, T, r, is_call, sigma_cold, group_starts, out,
+               tol=IV_TOL, xtol=IV_XTOL, max_iter=20):
+    """
+    Per-row log-space Householder IV solver (see vectorized_iv), compiled
+    with Numba when available.
+    Contracts (delimited by group_starts, as in warm_start_iv) run in
+    parallel; within a contract rows are solved in date order, each seeded
+    with the previous row's converged IV, or sigma_cold[i] if there is
+    none. Writes IVs (NaN on failure) to out.
+    """
+    for g in prange(group_starts.shape[0] - 1):
+        have_prev = False
+        sigma_prev = SIGMA_INIT
+
+        for i in range(group_starts[g], group_starts[g + 1]):
+            mp = market_price[i]
+            s_price = S[i]
+            k = K[i]
+            t = T[i]
+            th = 1.0 if is_call[i] else -1.0
+
+            sqrt_t = math.sqrt(t)
+            rt = r * t
+            log_fwd = math.log(s_price / k) + rt
+            k_disc = k * math.exp(-rt)
+            log_mp = math.log(mp)
+            sigma = sigma_prev if have_prev else sigma_cold[i]
+            iv = np.nan
+            converged = False
+
+            for _ in range(max_iter):
+                vol_t = sigma * sqrt_t
+                d1 = (log_fwd + 0.5 * sigma * sigma * t) / vol_t
+                d2 = d1 - vol_t
+
+                # N(x) = 0.5 * erfc(-x / sqrt(2)), accurate in both tails
+                bs_price = th * (s_price * 0.5 * math.erfc(-th * d1 * INV_SQRT_2)
+                                 - k_disc * 0.5 * math.erfc(-th * d2 * INV_SQRT_2))
+                vega = s_price * INV_SQRT_2PI * math.exp(-0.5 * d1 * d1) * sqrt_t
+
+                if bs_price <= 0 or vega < 1e-12:
+                    break
+                diff = math.log(bs_price) - log_mp
+                f_over_vega = bs_price / vega
+                corr = 1.0 - 0.5 * diff * (d1 * d2 / sigma * f_over_vega - 1.0)
+                step = diff * f_over_vega / max(corr, 0.5)
+
+                # Converged on the price itself, and only once sigma has stopped moving
+                if abs(bs_price - mp) < tol and abs(step) < xtol:
+                    iv = sigma
+                    converged = True
+                    break
+                sigma -= step
+                if sigma <= 0 or sigma > 10:
+                    break
+
+            out[i] = iv
+            # Failed rows re-seed the next day from the closed-form guess
+            have_prev = converged
+            sigma_prev = iv if converged else SIGMA_INIT
+
+
+if njit is not None:
+    # fastmath without nnan/ninf: NaN prices and failed steps must still fail the checks
+    _FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+    _iv_kernel = njit(parallel=True, fastmath=_FASTMATH, cache=True)(_iv_kernel)
+
+
+def compute_iv(market_price, S, K, T, r, is_call, group_starts, lo=IV_LOWER, hi=IV_UPPER):
+    """
+    Full IV pipeline: closed-form seed, warm-started Householder solve
+    (Numba kernel if available, else warm_start_iv), Chandrupatla rescue
+    for the rows it drops.
+
+    Rows with no root in [lo, hi] are NaN up front: a price at or below
+    intrinsic value, or outside [BS(lo), BS(hi)], has no volatility that
+    reproduces it, however well the solver is seeded.
+    Returns (iv, n_unconverged, n_rescued).
+    """
+    theta = np.where(is_call, 1.0, -1.0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        intrinsic = np.maximum(theta * (S - K * np.exp(-r * T)), 0.0)
+        solvable = ((market_price > intrinsic)
+                    & (bs_price(lo, S, K, T, r, theta) <= market_price)
+                    & (bs_price(hi, S, K, T, r, theta) >= market_price))
+
+    sigma_cold = closed_form_iv_guess(market_price, S, K, T, r, is_call)
+    if njit is not None:
+        iv = np.empty(len(market_price))
+        _iv_kernel(market_price, S, K, T, r, is_call, sigma_cold, group_starts, iv)
+    else:
+        iv = warm_start_iv(market_price, S, K, T, r, is_call, sigma_cold, group_starts)
+    iv[~solvable] = np.nan
+
+    # Chandrupatla safety net for solvable rows the iteration dropped
+    failed = solvable & ~np.isfinite(iv)
+    iv[failed] = chandrupatla_iv(market_price[failed], S[failed], K[failed], T[failed],
+                                 r, is_call[failed], lo=lo, hi=hi)
+    return iv, int(failed.sum()), int(np.isfinite(iv[failed]).sum())
 
 
 # ── Main Processing ────────────────────────────────────────────────────────
 
 def main():
     print("=" * 60)
-    print("  IV Calculation for 2024 F&O Data (Vectorized)")
+    print(f"  IV Calculation for 2024 F&O Data ({'Numba' if njit is not None else 'Vectorized'})")
     print("=" * 60)
 
-    # Load data
-    print("\n📂 Loading master_fo_data.csv...")
-    df = pd.read_csv(INPUT_FILE)
-    print(f"   Total rows loaded: {len(df):,}")
-
-    # Filter to 2024 only
-    df["TradDt"] = pd.to_datetime(df["TradDt"])
-    df_2024 = df[df["TradDt"].dt.year == 2026].copy()
-    del df  # free memory
-    print(f"   Rows for 2024: {len(df_2024):,}")
+    # Load data (streamed; only 2024 CE/PE rows are kept)
+    input_file = INPUT_FILE if os.path.exists(INPUT_FILE) else INPUT_CSV_FILE
+    print(f"\n📂 Loading {os.path.basename(input_file)}...")
+    df_2024, total_rows = load_option_rows(input_file, TARGET_YEAR)
+    print(f"   Total rows read: {total_rows:,}")
+    print(f"   Option rows (CE/PE) for 2024: {len(df_2024):,}")
 
     if len(df_2024) == 0:
         print("❌ No 2024 data found!")
         return
 
-    # Filter only option contracts (CE/PE)
-    df_2024 = df_2024[df_2024["OptnTp"].isin(["CE", "PE"])].copy()
-    print(f"   Option rows (CE/PE): {len(df_2024):,}")
-
     # Compute time to expiry (T) in years
-    df_2024["XpryDt"] = pd.to_datetime(df_2024["XpryDt"])
     df_2024["T"] = (df_2024["XpryDt"] - df_2024["TradDt"]).dt.days / 365.0
 
     # Filter valid rows
@@ -132,23 +489,36 @@ def main():
     df_2024 = df_2024[valid].copy()
     print(f"   Valid rows (T>0, prices>0): {len(df_2024):,}")
 
-    # Prepare arrays for vectorized computation
-    total = len(df_2024)
-    print(f"\n🔄 Computing IV for {total:,} rows (vectorized)...")
+    # Two-value column: categorical codes make the CE test an integer compare
+    df_2024["OptnTp"] = df_2024["OptnTp"].astype("category")
 
-    market_price = df_2024["ClsPric"].values.astype(np.float64)
-    S = df_2024["UndrlygPric"].values.astype(np.float64)
-    K = df_2024["StrkPric"].values.astype(np.float64)
-    T = df_2024["T"].values.astype(np.float64)
-    is_call = (df_2024["OptnTp"].values == "CE")
+    # Order each contract's rows by date so the previous day's IV can seed Newton
+    df_2024.sort_values(CONTRACT_KEYS + ["TradDt"], inplace=True)
+    df_2024.reset_index(drop=True, inplace=True)
+    contract_id = df_2024.groupby(CONTRACT_KEYS, sort=False).ngroup().values
+    group_starts = np.append(np.flatnonzero(np.diff(contract_id, prepend=-1)), len(df_2024))
 
-    # Run vectorized IV
+    # Prepare arrays for vectorized computation
+    total = len(df_2024)
+    print(f"\n🔄 Computing IV for {total:,} rows ({len(group_starts) - 1:,} contracts)...")
+
+    # The solve runs in float64: deep ITM time value is below float32 resolution
+    market_price = df_2024["ClsPric"].to_numpy(dtype=np.float64, copy=False)
+    S = df_2024["UndrlygPric"].to_numpy(dtype=np.float64, copy=False)
+    K = df_2024["StrkPric"].to_numpy(dtype=np.float64, copy=False)
+    T = df_2024["T"].to_numpy(dtype=np.float64, copy=False)
+    r = RISK_FREE_RATE
+    option_type = df_2024["OptnTp"].cat
+    is_call = option_type.codes.to_numpy() == option_type.categories.get_loc("CE")
+
+    # Run IV solver (Numba kernel if available, else vectorized NumPy)
     import time
     start = time.time()
-    iv_values = vectorized_iv(market_price, S, K, T, RISK_FREE_RATE, is_call)
+    iv_values, unconverged, rescued = compute_iv(market_price, S, K, T, r, is_call,
+                                                 group_starts)
     elapsed = time.time() - start
 
-    df_2024["VI"] = iv_values
+    df_2024["VI"] = pd.array(iv_values, dtype="Float32")  # stored as float32; NaN -> <NA>
 
     # Summary
     valid_count = np.isfinite(iv_values).sum()
@@ -156,14 +526,20 @@ def main():
     print(f"   ⏱️  Completed in {elapsed:.1f} seconds")
     print(f"\n📊 IV Calculation Summary:")
     print(f"   Total computed: {total:,}")
+    print(f"   Rescued by Chandrupatla: {rescued:,} of {unconverged:,} unconverged rows")
     print(f"   Valid IV: {valid_count:,} ({valid_count/total*100:.1f}%)")
     print(f"   Failed/NaN: {failed_count:,} ({failed_count/total*100:.1f}%)")
 
     # Save
-    df_2024.to_csv(OUTPUT_FILE, index=False)
+    df_2024.to_parquet(OUTPUT_FILE, engine="pyarrow", compression="snappy", index=False)
+    df_2024.round(CSV_DECIMALS).to_csv(OUTPUT_CSV_FILE, index=False)
     print(f"\n💾 Saved to: {OUTPUT_FILE}")
+    print(f"   CSV copy: {OUTPUT_CSV_FILE}")
     print(f"   Rows: {len(df_2024):,} | Columns: {list(df_2024.columns)}")
 
+    if not VERBOSE:
+        return
+
     # Sample output
     display_cols = ["TradDt", "TckrSymb", "StrkPric", "OptnTp", "ClsPric", "UndrlygPric", "T", "VI"]
     cols = [c for c in display_cols if c in df_2024.columns]
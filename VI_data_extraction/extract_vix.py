@@ -1,11 +1,13 @@
 """
 India VIX Historical Data Extraction from NSE
 ==============================================
-Uses Selenium with a VISIBLE browser to navigate the NSE VIX historical page,
-interact with the date pickers, and download the CSV data.
+Fetches each date chunk from NSE's vixhistory JSON API with a requests
+session that first picks up cookies from the homepage and the VIX page,
+like a browser does.
 
-NSE aggressively blocks all API calls — this approach works because it uses
-the actual page UI exactly like a human would.
+If NSE rejects the session (401/403), falls back to Selenium with a VISIBLE
+browser that navigates the VIX historical page, interacts with the date
+pickers, and downloads the CSV data exactly like a human would.
 
 Date Range: 2024-08-01 → 2026-02-12
 """
@@ -15,17 +17,23 @@ import sys
 import time
 import glob
 import shutil
+import threading
+import requests
 import pandas as pd
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.common.action_chains import ActionChains
+except ImportError:
+    webdriver = None  # Only needed for the browser fallback
 
 try:
     from webdriver_manager.chrome import ChromeDriverManager
@@ -43,6 +51,22 @@ DOWNLOAD_DIR = os.path.join(OUTPUT_DIR, "downloads_temp")
 
 BASE_URL = "https://www.nseindia.com"
 VIX_PAGE = f"{BASE_URL}/reports-indices-historical-vix"
+VIX_API = f"{BASE_URL}/api/historical/vixhistory"
+REQUEST_TIMEOUT = 15  # seconds
+MAX_WORKERS = 4  # Concurrent API sessions
+REQUEST_DELAY = 0.5  # Pause after each API call per worker, to stay polite
+
+SESSION_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": VIX_PAGE,
+}
+
+DATE_FORMATS = ["%d-%b-%Y", "%d-%m-%Y", "%Y-%m-%d", "%b %d, %Y"]
 
 MONTH_MAP = {
     1: "Jan", 2: "Feb", 3: "Mar", 4: "Apr", 5: "May", 6: "Jun",
@@ -63,6 +87,27 @@ def date_to_str(d):
     return d.strftime("%d-%b-%Y")
 
 
+def parse_dates(col):
+    """
+    Parse a column of NSE date strings in one pass: the format is detected
+    from the first non-null cell, falling back to mixed parsing (unparsable
+    cells become NaT) if the column does not follow it throughout.
+    """
+    sample = col.dropna()
+    if len(sample):
+        sample = str(sample.iloc[0]).strip()
+        for fmt in DATE_FORMATS:
+            try:
+                datetime.strptime(sample, fmt)
+            except ValueError:
+                continue
+            try:
+                return pd.to_datetime(col, format=fmt)
+            except (ValueError, TypeError):
+                break
+    return pd.to_datetime(col, format="mixed", errors="coerce")
+
+
 def generate_date_chunks(start, end, chunk_days=CHUNK_DAYS):
     """Split a date range into chunks."""
     chunks = []
@@ -74,6 +119,47 @@ def generate_date_chunks(start, end, chunk_days=CHUNK_DAYS):
     return chunks
 
 
+def create_session():
+    """Create a requests session carrying the cookies NSE sets on its pages."""
+    sess = requests.Session()
+    sess.headers.update(SESSION_HEADERS)
+    sess.get(BASE_URL, timeout=REQUEST_TIMEOUT)
+    sess.get(VIX_PAGE, timeout=REQUEST_TIMEOUT)
+    return sess
+
+
+def fetch_vix_chunk(sess, from_date, to_date):
+    """
+    Fetch one date chunk from the vixhistory API.
+    Returns a DataFrame, or None if NSE returned no rows.
+    Raises requests.HTTPError on a non-2xx response (401/403 = blocked).
+    """
+    params = {"from": from_date.strftime("%d-%m-%Y"), "to": to_date.strftime("%d-%m-%Y")}
+    resp = sess.get(VIX_API, params=params, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    data = resp.json()
+    if data.get("data"):
+        return pd.DataFrame(data["data"])
+    return None
+
+
+_thread_state = threading.local()
+
+
+def fetch_chunk_worker(from_date, to_date):
+    """
+    Thread pool task: fetch one chunk with this worker thread's own session
+    (created and cookie-seeded on first use), then pause REQUEST_DELAY.
+    """
+    sess = getattr(_thread_state, "session", None)
+    if sess is None:
+        sess = _thread_state.session = create_session()
+    try:
+        return fetch_vix_chunk(sess, from_date, to_date)
+    finally:
+        time.sleep(REQUEST_DELAY)
+
+
 def create_browser():
     """Create a visible Chrome/Edge browser with download directory set."""
     os.makedirs(DOWNLOAD_DIR, exist_ok=True)
@@ -442,29 +528,24 @@ def try_scrape_table(driver):
 
 # ── Main Extraction Logic ──────────────────────────────────────────────────
 
-def extract_vix_data():
-    """Main function to extract VIX historical data using Selenium UI automation."""
-    print("=" * 60)
-    print("  India VIX Historical Data Extraction (Selenium UI)")
-    print(f"  Date Range: {START_DATE} → {END_DATE}")
-    print("=" * 60)
+def extract_via_browser(chunks):
+    """Selenium fallback: download each chunk through the VIX page UI."""
+    if webdriver is None:
+        print("❌ Selenium is not installed; cannot fall back to the browser.")
+        return []
 
     driver = None
+    all_dfs = []
     try:
         driver = create_browser()
 
         # First visit NSE homepage to establish cookies
-        print("\n🌐 Establishing session with NSE...")
+        print("\n🌐 Establishing browser session with NSE...")
         driver.get(BASE_URL)
         wait_for_page_load(driver)
         time.sleep(3)
         print(f"✅ NSE loaded. Title: {driver.title}")
 
-        # Generate date chunks
-        chunks = generate_date_chunks(START_DATE, END_DATE)
-        print(f"\n📊 Total chunks to process: {len(chunks)}\n")
-
-        all_dfs = []
         os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
         for i, (from_date, to_date) in enumerate(chunks, 1):
@@ -503,6 +584,61 @@ def extract_vix_data():
                 wait_for_page_load(driver)
                 time.sleep(2)
 
+    finally:
+        if driver:
+            driver.quit()
+            print("\n🔒 Browser closed.")
+
+    return all_dfs
+
+
+def extract_vix_data():
+    """Main function to extract VIX historical data (API session, Selenium fallback)."""
+    print("=" * 60)
+    print("  India VIX Historical Data Extraction")
+    print(f"  Date Range: {START_DATE} → {END_DATE}")
+    print("=" * 60)
+
+    try:
+        # Generate date chunks
+        chunks = generate_date_chunks(START_DATE, END_DATE)
+        print(f"\n📊 Total chunks to process: {len(chunks)}\n")
+
+        print(f"🌐 Fetching via NSE API ({MAX_WORKERS} sessions)...")
+        results = {}
+        blocked = []
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+            futures = {ex.submit(fetch_chunk_worker, a, b): i for i, (a, b) in enumerate(chunks)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                from_date, to_date = chunks[i]
+                label = f"[{i + 1}/{len(chunks)}] {from_date} → {to_date}:"
+                try:
+                    df = fut.result()
+                except requests.HTTPError as e:
+                    if e.response.status_code in (401, 403):
+                        print(f"{label} ⚠️  Blocked by NSE ({e.response.status_code})")
+                        blocked.append(i)
+                    else:
+                        print(f"{label} ⚠️  {e}")
+                    continue
+                except (requests.RequestException, ValueError) as e:
+                    print(f"{label} ⚠️  {e}")
+                    continue
+
+                if df is not None:
+                    results[i] = df
+                    print(f"{label} 📋 {len(df)} rows loaded")
+                else:
+                    print(f"{label} ⚠️  No data for this chunk")
+
+        # Keep chunk order so the concat matches the sequential download
+        all_dfs = [results[i] for i in sorted(results)]
+
+        if blocked:
+            print(f"\n🔁 Falling back to browser automation for {len(blocked)} blocked chunk(s)...")
+            all_dfs += extract_via_browser([chunks[i] for i in sorted(blocked)])
+
         if not all_dfs:
             print("\n❌ No data was retrieved!")
             print("   This may be because NSE is blocking automated access.")
@@ -540,14 +676,7 @@ def extract_vix_data():
 
         # Parse dates and sort
         if "Date" in df.columns:
-            for fmt in ["%d-%b-%Y", "%d-%m-%Y", "%Y-%m-%d", "%b %d, %Y"]:
-                try:
-                    df["Date"] = pd.to_datetime(df["Date"], format=fmt)
-                    break
-                except (ValueError, TypeError):
-                    continue
-            else:
-                df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+            df["Date"] = parse_dates(df["Date"])
 
             df.sort_values("Date", inplace=True)
             df.reset_index(drop=True, inplace=True)
@@ -582,11 +711,6 @@ def extract_vix_data():
         traceback.print_exc()
         return None
 
-    finally:
-        if driver:
-            driver.quit()
-            print("\n🔒 Browser closed.")
-
 
 if __name__ == "__main__":
     extract_vix_data()
@@ -4,15 +4,44 @@ pick the ONE row where StrkPric is closest to UndrlygPric.
 Saves result as atm_vi_data.csv
 """
 
+import numpy as np
 import pandas as pd
 import os
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
 # ── Configuration ───────────────────────────────────────────────────────────
-INPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vi_data_historical.csv")
+INPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vi_data_historical.parquet")
 OUTPUT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "atm_vi_data.csv")
 
+GROUP_KEYS = ["TradDt", "TckrSymb", "OptnTp"]
+
+
+# ── Helpers ─────────────────────────────────────────────────────────────────
+def group_argmin(keys, values):
+    """
+    Row positions of the minimum of `values` within each group of `keys`
+    (a list of equal-length columns), ties going to the first row.
+    Uses one stable sort over a combined integer key plus a segmented
+    np.minimum.reduceat scan instead of a hashed groupby-idxmin.
+    Groups come out in sorted key order.
+    """
+    code = np.zeros(len(values), dtype=np.int64)
+    for col in keys:
+        col_code, uniques = pd.factorize(col, sort=True)
+        code = code * len(uniques) + col_code
+
+    order = np.argsort(code, kind="stable")
+    starts = np.flatnonzero(np.diff(code[order], prepend=-1))
+    v = values[order]
+    v = np.where(np.isnan(v), np.inf, v)  # idxmin skips NaN
+
+    seg_min = np.minimum.reduceat(v, starts)
+    lengths = np.diff(np.append(starts, len(v)))
+    hits = np.flatnonzero(v == np.repeat(seg_min, lengths))
+    return order[hits[np.searchsorted(hits, starts)]]
+
+
 # ── Main ────────────────────────────────────────────────────────────────────
 print("=" * 60)
 print("  Filter ATM Options — Closest Strike to Underlying")
@@ -20,26 +49,20 @@ print("  One entry per (Date, Symbol, CE/PE)")
 print("=" * 60)
 
 print(f"\n📂 Loading data...")
-df = pd.read_csv(INPUT_FILE)
-print(f"   Total rows: {len(df):,}")
-
-# Only keep CE and PE rows
-df = df[df["OptnTp"].isin(["CE", "PE"])].copy()
+df = pd.read_parquet(INPUT_FILE, engine="pyarrow")
+# calculate_vi_2024.py only writes CE/PE rows, with TradDt already a datetime
 print(f"   Option rows (CE/PE): {len(df):,}")
 
-# Calculate absolute distance from strike to underlying
-df["_dist"] = abs(df["StrkPric"] - df["UndrlygPric"])
-
-# For each (TradDt, TckrSymb, OptnTp), pick the row with minimum distance
-idx = df.groupby(["TradDt", "TckrSymb", "OptnTp"])["_dist"].idxmin()
-atm = df.loc[idx].copy()
-
-# Drop helper column
-atm.drop(columns=["_dist"], inplace=True)
+# Absolute distance from strike to underlying, computed in place into one
+# float64 buffer (float32 rounding could tie strikes that are not equidistant)
+dist = np.empty(len(df), dtype=np.float64)
+np.subtract(df["StrkPric"].to_numpy(copy=False), df["UndrlygPric"].to_numpy(copy=False), out=dist)
+np.abs(dist, out=dist)
 
-# Sort
-atm.sort_values(["TradDt", "TckrSymb", "OptnTp", "StrkPric"], inplace=True)
-atm.reset_index(drop=True, inplace=True)
+# For each (TradDt, TckrSymb, OptnTp), pick the row with minimum distance;
+# rows come back already sorted by (TradDt, TckrSymb, OptnTp)
+pos = group_argmin([df[c] for c in GROUP_KEYS], dist)
+atm = df.iloc[pos].reset_index(drop=True)
 
 # Save
 atm.to_csv(OUTPUT_FILE, index=False)
@@ -18,8 +18,8 @@ Forward Volatility = sqrt(Forward_Variance)
 import pandas as pd
 import numpy as np
 from utils import (
-    load_data, get_atm_options, compute_forward_factor,
-    calc_metrics, print_metrics, ensure_results_dir
+    load_data, get_atm_options, compute_forward_factor, segment_starts,
+    calc_metrics, print_metrics, ensure_results_dir, save_csv, VERBOSE
 )
 
 
@@ -29,60 +29,65 @@ FF_THRESHOLD_DOUBLE = 0.9     # Enter double calendar when FF > 0.9 (90%)
 MIN_T1_DAYS = 5               # Minimum DTE for front month (avoid last-day noise)
 MAX_T1_DAYS = 60              # Maximum DTE for front month
 MIN_T2_T1_GAP_DAYS = 15       # Minimum gap between expiries
+MAX_T2_DAYS = 400             # Maximum DTE for back month
+
+
+PAIR_KEYS = ["TradDt", "TckrSymb", "OptnTp"]
 
 
 def build_calendar_pairs(atm_df):
     """
     For each (TradDt, TckrSymb, OptnTp), pair the nearest expiry (T1)
     with each further expiry (T2) to form calendar spread candidates.
+
+    Vectorized: after one sort by key and T every group is a contiguous
+    segment whose first row is the front month, so the pairs are just
+    (segment start, later row) index pairs; each output column is a
+    typed take on those indices.
     """
-    pairs = []
-
-    grouped = atm_df.groupby(["TradDt", "TckrSymb", "OptnTp"])
-
-    for (trade_dt, symbol, opt_type), group in grouped:
-        if len(group) < 2:
-            continue
-
-        # Sort by time to expiry
-        group = group.sort_values("T")
-        rows = group.to_dict("records")
-
-        # Front month = shortest T
-        front = rows[0]
-        t1_days = front["T"] * 365
-
-        if t1_days < MIN_T1_DAYS or t1_days > MAX_T1_DAYS:
-            continue
-
-        # Pair front with each back month
-        for back in rows[1:]:
-            t2_days = back["T"] * 365
-            gap_days = t2_days - t1_days
-
-            if gap_days < MIN_T2_T1_GAP_DAYS:
-                continue
-
-            pairs.append({
-                "TradDt": trade_dt,
-                "TckrSymb": symbol,
-                "OptnTp": opt_type,
-                # Front month
-                "Front_StrkPric": front["StrkPric"],
-                "Front_ClsPric": front["ClsPric"],
-                "Front_IV": front["VI"],
-                "Front_T": front["T"],
-                "Front_XpryDt": front["XpryDt"],
-                "UndrlygPric": front["UndrlygPric"],
-                # Back month
-                "Back_StrkPric": back["StrkPric"],
-                "Back_ClsPric": back["ClsPric"],
-                "Back_IV": back["VI"],
-                "Back_T": back["T"],
-                "Back_XpryDt": back["XpryDt"],
-            })
-
-    return pd.DataFrame(pairs)
+    # Cap the back month at MAX_T2_DAYS before sorting; a valid front is
+    # always <= MAX_T1_DAYS, so this only removes back-month candidates
+    legs = atm_df[atm_df["T"].to_numpy() * 365 <= MAX_T2_DAYS]
+    legs = legs.sort_values(PAIR_KEYS + ["T"], kind="mergesort")
+    starts = segment_starts(legs, PAIR_KEYS)
+    lengths = np.diff(np.append(starts, len(legs)))
+    t = legs["T"].to_numpy()
+    t_days = t * 365  # once per leg; the DTE checks below index into it
+
+    # Front month = shortest T
+    t1_days = t_days[starts]
+    front_ok = (t1_days >= MIN_T1_DAYS) & (t1_days <= MAX_T1_DAYS)
+
+    # Pair front with each back month
+    group = np.repeat(np.arange(len(starts)), lengths)
+    is_back = front_ok[group]
+    is_back[starts] = False
+    back = np.flatnonzero(is_back)
+    front = starts[group[back]]
+
+    gap_days = t_days[back] - t_days[front]
+    keep = (t[back] > t[front]) & (gap_days >= MIN_T2_T1_GAP_DAYS)
+    front, back = front[keep], back[keep]
+
+    def take(col, rows):
+        return legs[col].array.take(rows)
+
+    return pd.DataFrame({
+        **{key: take(key, front) for key in PAIR_KEYS},
+        # Front month
+        "Front_StrkPric": take("StrkPric", front),
+        "Front_ClsPric": take("ClsPric", front),
+        "Front_IV": take("VI", front),
+        "Front_T": take("T", front),
+        "Front_XpryDt": take("XpryDt", front),
+        "UndrlygPric": take("UndrlygPric", front),
+        # Back month
+        "Back_StrkPric": take("StrkPric", back),
+        "Back_ClsPric": take("ClsPric", back),
+        "Back_IV": take("VI", back),
+        "Back_T": take("T", back),
+        "Back_XpryDt": take("XpryDt", back),
+    })
 
 
 def run_forward_factor_backtest():
@@ -134,15 +139,18 @@ def run_forward_factor_backtest():
     print("[5/5] Generating signals and computing P&L...")
 
     # Signal: FF > threshold
-    signals = pairs[pairs["ForwardFactor"] > FF_THRESHOLD_ATM].copy()
+    ff = pairs["ForwardFactor"].to_numpy()
+    signals = pairs[ff > FF_THRESHOLD_ATM]
     print(f"  Signals (FF > {FF_THRESHOLD_ATM}): {len(signals):,}")
 
     if len(signals) == 0:
         print("  No signals generated. Trying lower threshold...")
-        # Try progressively lower thresholds
+        # Try progressively lower thresholds; the first one below the
+        # largest FF is the first that yields signals
+        ff_max = ff.max(initial=-np.inf)
         for threshold in [0.5, 0.3, 0.1, 0.0]:
-            signals = pairs[pairs["ForwardFactor"] > threshold].copy()
-            if len(signals) > 0:
+            if ff_max > threshold:
+                signals = pairs[ff > threshold]
                 print(f"  Using threshold {threshold}: {len(signals):,} signals")
                 break
 
@@ -161,8 +169,12 @@ def run_forward_factor_backtest():
     # More accurate: We track if the front option would expire worthless (good for seller)
     # and estimate remaining value of the back-month option.
 
+    front_cls = signals["Front_ClsPric"].to_numpy()
+    back_cls = signals["Back_ClsPric"].to_numpy()
+    front_iv = signals["Front_IV"].to_numpy()
+
     # Entry cost (debit paid)
-    signals["SpreadCost"] = signals["Back_ClsPric"] - signals["Front_ClsPric"]
+    spread_cost = back_cls - front_cls
 
     # Simplified P&L model:
     # If FF is high, front IV is relatively expensive vs forward vol.
@@ -171,21 +183,26 @@ def run_forward_factor_backtest():
     # where exit_factor accounts for the back month also decaying somewhat
 
     # Time decay advantage ratio
-    signals["ThetaEdge"] = (signals["Front_IV"] - signals["ForwardVol"]) / signals["Front_IV"]
-    signals["ThetaEdge"] = signals["ThetaEdge"].clip(0, 1)
+    theta_edge = front_iv - signals["ForwardVol"].to_numpy()
+    theta_edge /= front_iv
+    np.clip(theta_edge, 0, 1, out=theta_edge)
 
     # Estimated P&L per spread
     # Front premium captured (theta decay) minus partial back-month decay
     front_decay_pct = 0.70  # ~70% of front premium decays if held to near-expiry
     back_decay_pct = 0.25   # ~25% of back premium decays in the same period
 
-    signals["EstPnL"] = (
-        signals["Front_ClsPric"] * front_decay_pct  # earned from selling front
-        - signals["Back_ClsPric"] * back_decay_pct   # lost from back decaying
+    est_pnl = (
+        front_cls * front_decay_pct  # earned from selling front
+        - back_cls * back_decay_pct   # lost from back decaying
     )
 
     # Weight by Forward Factor edge (higher FF = more confident)
-    signals["WeightedPnL"] = signals["EstPnL"] * (1 + signals["ThetaEdge"] * 0.5)
+    weighted_pnl = est_pnl * (1 + theta_edge * 0.5)
+
+    # One assign for all four columns (signals is a filtered view of pairs)
+    signals = signals.assign(SpreadCost=spread_cost, ThetaEdge=theta_edge,
+                             EstPnL=est_pnl, WeightedPnL=weighted_pnl)
 
     # Build trade log
     trade_log = signals[[
@@ -204,22 +221,24 @@ def run_forward_factor_backtest():
     print_metrics(metrics, "Forward Factor Calendar Spread")
 
     # Build equity curve
-    equity = trade_log[["TradDt", "EstPnL"]].groupby("TradDt")["EstPnL"].sum().reset_index()
+    # trade_log is already in TradDt order, so the groups need no sort
+    equity = trade_log.groupby("TradDt", sort=False, observed=True)["EstPnL"].sum().reset_index()
     equity.columns = ["Date", "DailyPnL"]
     equity["CumulativePnL"] = equity["DailyPnL"].cumsum()
 
     # Save results
     results_dir = ensure_results_dir()
-    trade_log.to_csv(f"{results_dir}/ff_trade_log.csv", index=False)
-    equity.to_csv(f"{results_dir}/ff_equity_curve.csv", index=False)
+    save_csv(trade_log, f"{results_dir}/ff_trade_log.csv")
+    save_csv(equity, f"{results_dir}/ff_equity_curve.csv")
     print(f"\n  Trade log saved: {results_dir}/ff_trade_log.csv")
     print(f"  Equity curve saved: {results_dir}/ff_equity_curve.csv")
 
     # Print sample trades
-    display_cols = ["TradDt", "TckrSymb", "OptnTp", "Front_IV", "Back_IV",
-                    "ForwardFactor", "SpreadCost", "EstPnL"]
-    print(f"\n  Sample trades (first 15):")
-    print(trade_log[display_cols].head(15).to_string())
+    if VERBOSE:
+        display_cols = ["TradDt", "TckrSymb", "OptnTp", "Front_IV", "Back_IV",
+                        "ForwardFactor", "SpreadCost", "EstPnL"]
+        print(f"\n  Sample trades (first 15):")
+        print(trade_log[display_cols].head(15).to_string())
 
     # FF distribution
     print(f"\n  Forward Factor Distribution:")
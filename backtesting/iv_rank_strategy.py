@@ -14,9 +14,16 @@ IV Rank = (Current_IV - Min_IV) / (Max_IV - Min_IV) * 100
 
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 from utils import (
-    load_data, get_atm_options,
-    calc_metrics, print_metrics, ensure_results_dir
+    load_data, get_atm_options, category_codes, segment_starts,
+    calc_metrics, print_metrics, ensure_results_dir, save_csv, VERBOSE
 )
 
 
@@ -27,15 +34,52 @@ MAX_HOLDING_DAYS = 15     # Max holding period (trading days)
 ROLLING_WINDOW = 20       # Rolling window for IV rank (trading days)
 MIN_WINDOW_DATA = 10      # Minimum data points for rank calculation
 
+DAY_NS = 86_400 * 1_000_000_000  # TradDt arithmetic is done on int64 nanoseconds
+# Up to this many window cells (rows * window) an ungrouped rolling min/max is
+# cheaper as strided NumPy reductions than through pandas' per-call overhead
+STRIDED_MAX_CELLS = 1 << 13
 
-def compute_iv_rank(iv_series, window=ROLLING_WINDOW, min_periods=MIN_WINDOW_DATA):
+
+def compute_iv_rank(iv_series, window=ROLLING_WINDOW, min_periods=MIN_WINDOW_DATA, groups=None):
     """
     Compute rolling IV percentile rank.
     IV Rank = (Current - Rolling_Min) / (Rolling_Max - Rolling_Min) * 100
+    Short ungrouped series (one symbol's history) use strided NumPy windows.
+    With groups (e.g. the TckrSymb column) the window rolls separately
+    within each group, in row order: with Numba the rows are stably
+    ordered by group and every group's slice fills preallocated min/max
+    buffers; otherwise it is a single pandas grouped rolling pass.
     """
     iv_series = pd.Series(iv_series).reset_index(drop=True)
-    rolling_min = iv_series.rolling(window=window, min_periods=min_periods).min()
-    rolling_max = iv_series.rolling(window=window, min_periods=min_periods).max()
+    if groups is None and 0 < len(iv_series) * window <= STRIDED_MAX_CELLS:
+        rolling_min, rolling_max = _strided_rolling_minmax(
+            iv_series.to_numpy(dtype=np.float64), window, min_periods)
+        rolling_min = pd.Series(rolling_min)
+        rolling_max = pd.Series(rolling_max)
+    elif groups is None:
+        rolling = iv_series.rolling(window=window, min_periods=min_periods)
+        rolling_min = rolling.min()
+        rolling_max = rolling.max()
+    elif njit is not None:
+        codes = category_codes(pd.Series(groups).reset_index(drop=True))
+        order = np.argsort(codes, kind="stable")  # identity when already grouped
+        values = iv_series.to_numpy(dtype=np.float64)[order]
+        starts = segment_starts(pd.DataFrame({"g": codes[order]}), ["g"])
+        seg_min = np.empty(len(values))
+        seg_max = np.empty(len(values))
+        _segment_rolling_minmax(values, starts, window, min_periods, seg_min, seg_max)
+        rolling_min = np.empty(len(values))
+        rolling_max = np.empty(len(values))
+        rolling_min[order] = seg_min
+        rolling_max[order] = seg_max
+        rolling_min = pd.Series(rolling_min)
+        rolling_max = pd.Series(rolling_max)
+    else:
+        groups = pd.Series(groups).reset_index(drop=True)
+        rolling = iv_series.groupby(groups, sort=False, observed=True).rolling(
+            window=window, min_periods=min_periods)
+        rolling_min = rolling.min().droplevel(0).sort_index()
+        rolling_max = rolling.max().droplevel(0).sort_index()
 
     iv_range = rolling_max - rolling_min
     iv_rank = np.where(iv_range > 1e-8,
@@ -44,6 +88,90 @@ def compute_iv_rank(iv_series, window=ROLLING_WINDOW, min_periods=MIN_WINDOW_DAT
     return iv_rank
 
 
+def _strided_rolling_minmax(values, window, min_periods):
+    """
+    Trailing-window min/max of a 1-D array as pandas rolling().min()/.max():
+    a (n, window) sliding_window_view over NaN-padded values, reduced along
+    the window with NaNs masked out and rows under min_periods set to NaN.
+    """
+    windows = sliding_window_view(
+        np.concatenate([np.full(window - 1, np.nan), values]), window)
+    present = ~np.isnan(windows)
+    rolling_min = np.where(present, windows, np.inf).min(axis=-1)
+    rolling_max = np.where(present, windows, -np.inf).max(axis=-1)
+    short = present.sum(axis=-1) < max(min_periods, 1)
+    rolling_min[short] = np.nan
+    rolling_max[short] = np.nan
+    return rolling_min, rolling_max
+
+
+def _segment_rolling_minmax(values, starts, window, min_periods, out_min, out_max):
+    """
+    Trailing-window min/max within each segment [starts[k], starts[k+1]),
+    as pandas rolling(window, min_periods).min()/.max() per group:
+    NaNs are skipped and rows with fewer than min_periods values get NaN.
+    """
+    n = values.shape[0]
+    for k in range(starts.shape[0]):
+        lo = starts[k]
+        hi = starts[k + 1] if k + 1 < starts.shape[0] else n
+        for i in range(lo, hi):
+            count = 0
+            mn = np.inf
+            mx = -np.inf
+            for j in range(max(lo, i - window + 1), i + 1):
+                v = values[j]
+                if not np.isnan(v):
+                    count += 1
+                    mn = min(mn, v)
+                    mx = max(mx, v)
+            if count >= max(min_periods, 1):
+                out_min[i] = mn
+                out_max[i] = mx
+            else:
+                out_min[i] = np.nan
+                out_max[i] = np.nan
+
+
+if njit is not None:
+    _segment_rolling_minmax = njit(cache=True)(_segment_rolling_minmax)
+
+
+def _scan_positions(symbol_code, dt_ns, iv_rank, cost, entry_rank, exit_rank, max_hold_ns,
+                    entry_out, exit_out):
+    """
+    Walk the straddle rows (sorted by symbol, then date) holding at most one
+    open position per symbol. A position exits once IV rank rises above
+    exit_rank or it has been held max_hold_ns; a new one opens when IV rank
+    is below entry_rank and the straddle has a positive cost (also on the
+    row that just closed a position).
+    Writes each trade's entry and exit row to entry_out / exit_out and
+    returns the trade count. Positions still open at the end are dropped.
+    """
+    n_trades = 0
+    entry = -1
+    for i in range(symbol_code.shape[0]):
+        if i > 0 and symbol_code[i] != symbol_code[i - 1]:
+            entry = -1
+
+        # Check for exit
+        if entry >= 0 and (iv_rank[i] > exit_rank or dt_ns[i] - dt_ns[entry] >= max_hold_ns):
+            entry_out[n_trades] = entry
+            exit_out[n_trades] = i
+            n_trades += 1
+            entry = -1
+
+        # Check for entry (only if not already in a position)
+        if entry < 0 and iv_rank[i] < entry_rank and cost[i] > 0:
+            entry = i
+
+    return n_trades
+
+
+if njit is not None:
+    _scan_positions = njit(cache=True)(_scan_positions)
+
+
 def run_iv_rank_backtest():
     """Run the IV Rank Long Straddle backtest."""
 
@@ -63,13 +191,14 @@ def run_iv_rank_backtest():
 
     # Keep only nearest expiry per (TradDt, TckrSymb, OptnTp)
     atm_nearest = atm.sort_values("T")
-    atm_nearest = atm_nearest.groupby(["TradDt", "TckrSymb", "OptnTp"]).first().reset_index()
+    atm_nearest = atm_nearest.groupby(["TradDt", "TckrSymb", "OptnTp"], observed=True).first().reset_index()
     print(f"  ATM nearest-expiry rows: {len(atm_nearest):,}")
 
     # 3. Build straddles: merge CE and PE for each (TradDt, TckrSymb)
     print("[3/5] Building ATM straddles...")
-    ce = atm_nearest[atm_nearest["OptnTp"] == "CE"].copy()
-    pe = atm_nearest[atm_nearest["OptnTp"] == "PE"].copy()
+    # Only the legs' prices and IVs are merged (underlying taken from the CE leg)
+    ce = atm_nearest.loc[atm_nearest["OptnTp"] == "CE", ["TradDt", "TckrSymb", "ClsPric", "VI", "UndrlygPric"]]
+    pe = atm_nearest.loc[atm_nearest["OptnTp"] == "PE", ["TradDt", "TckrSymb", "ClsPric", "VI"]]
 
     straddles = ce.merge(pe, on=["TradDt", "TckrSymb"], suffixes=("_CE", "_PE"))
 
@@ -79,89 +208,39 @@ def run_iv_rank_backtest():
 
     straddles["StraddleCost"] = straddles["ClsPric_CE"] + straddles["ClsPric_PE"]
     straddles["AvgIV"] = (straddles["VI_CE"] + straddles["VI_PE"]) / 2
-    straddles["UndrlygPric"] = straddles["UndrlygPric_CE"]
+    straddles = straddles.drop(columns=["ClsPric_CE", "ClsPric_PE", "VI_CE", "VI_PE"])
 
     print(f"  Straddles formed: {len(straddles):,}")
 
     # 4. Compute IV Rank for each symbol
     print("[4/5] Computing IV Rank per symbol...")
-    straddles.sort_values(["TckrSymb", "TradDt"], inplace=True)
-
-    iv_rank_all = []
-    for symbol, sdf in straddles.groupby("TckrSymb"):
-        sdf = sdf.sort_values("TradDt").copy()
-        sdf["IVRank"] = compute_iv_rank(sdf["AvgIV"].values)
-        iv_rank_all.append(sdf)
-
-    straddles = pd.concat(iv_rank_all, ignore_index=True)
-    straddles = straddles[straddles["IVRank"].notna()].copy()
+    straddles.sort_values(["TckrSymb", "TradDt"], kind="mergesort", inplace=True)
+    straddles.reset_index(drop=True, inplace=True)
+    straddles["IVRank"] = compute_iv_rank(straddles["AvgIV"], groups=straddles["TckrSymb"])
+    straddles = straddles[straddles["IVRank"].notna()]
     print(f"  Rows with valid IV rank: {len(straddles):,}")
 
     # 5. Generate signals and simulate trades
     print("[5/5] Generating signals and computing P&L...")
 
-    trades = []
-    # Track open positions per symbol
-    open_positions = {}  # symbol -> entry row
-
-    straddles.sort_values("TradDt", inplace=True)
-
-    for _, row in straddles.iterrows():
-        symbol = row["TckrSymb"]
-        trade_dt = row["TradDt"]
-        iv_rank = row["IVRank"]
-
-        # Check for exit
-        if symbol in open_positions:
-            entry = open_positions[symbol]
-            days_held = (trade_dt - entry["TradDt"]).days
-
-            should_exit = (iv_rank > IV_RANK_EXIT) or (days_held >= MAX_HOLDING_DAYS)
-
-            if should_exit:
-                # P&L: change in straddle value
-                # If IV expanded, straddle value goes up
-                exit_straddle = row["StraddleCost"]
-                entry_straddle = entry["StraddleCost"]
-
-                # Also account for underlying price movement
-                # Straddle profits if price moves enough
-                underly_move = abs(row["UndrlygPric"] - entry["UndrlygPric"])
-                move_pct = underly_move / entry["UndrlygPric"] if entry["UndrlygPric"] > 0 else 0
-
-                # P&L = exit value - entry cost
-                # Straddle value at exit includes both IV change and price movement
-                pnl = exit_straddle - entry_straddle
-
-                # If IV expanded significantly, add the vega gain
-                iv_change = row["AvgIV"] - entry["AvgIV"]
-
-                trades.append({
-                    "EntryDate": entry["TradDt"],
-                    "ExitDate": trade_dt,
-                    "TckrSymb": symbol,
-                    "EntryIVRank": entry["IVRank"],
-                    "ExitIVRank": iv_rank,
-                    "EntryIV": entry["AvgIV"],
-                    "ExitIV": row["AvgIV"],
-                    "IVChange": iv_change,
-                    "EntryStraddleCost": entry_straddle,
-                    "ExitStraddleValue": exit_straddle,
-                    "UndrlygMove_Pct": round(move_pct * 100, 2),
-                    "DaysHeld": days_held,
-                    "PnL": round(pnl, 2),
-                    "PnL_Pct": round(pnl / entry_straddle * 100, 2) if entry_straddle > 0 else 0,
-                    "ExitReason": "IV_Expansion" if iv_rank > IV_RANK_EXIT else "MaxDays"
-                })
-
-                del open_positions[symbol]
-
-        # Check for entry (only if not already in a position)
-        if symbol not in open_positions and iv_rank < IV_RANK_ENTRY:
-            if row["StraddleCost"] > 0:
-                open_positions[symbol] = row.to_dict()
-
-    if len(trades) == 0:
+    # Contiguous per-symbol, date-ordered arrays for the position scan (the
+    # step 4 sort still holds); dates as int64 ns for the holding-period test
+    symbols = straddles["TckrSymb"].array
+    symbol_code = category_codes(straddles["TckrSymb"])
+    trade_dates = straddles["TradDt"].to_numpy("datetime64[ns]")
+    dt_ns = trade_dates.view("int64")
+    iv_rank = straddles["IVRank"].to_numpy(dtype=np.float64)
+    cost = straddles["StraddleCost"].to_numpy(dtype=np.float64)
+    avg_iv = straddles["AvgIV"].to_numpy(dtype=np.float64)
+    spot = straddles["UndrlygPric"].to_numpy(dtype=np.float64)
+
+    entry_rows = np.empty(len(straddles), dtype=np.int64)
+    exit_rows = np.empty(len(straddles), dtype=np.int64)
+    n_trades = _scan_positions(symbol_code, dt_ns, iv_rank, cost,
+                               IV_RANK_ENTRY, IV_RANK_EXIT, MAX_HOLDING_DAYS * DAY_NS,
+                               entry_rows, exit_rows)
+
+    if n_trades == 0:
         print("  No trades generated. Adjusting thresholds...")
         # Show IV Rank distribution
         print(f"  IV Rank distribution:")
@@ -173,8 +252,33 @@ def run_iv_rank_backtest():
         print(f"    < 40: {(straddles['IVRank'] < 40).sum()}")
         return None, None
 
-    trade_log = pd.DataFrame(trades)
-    trade_log.sort_values("EntryDate", inplace=True)
+    entry = entry_rows[:n_trades]
+    exit_ = exit_rows[:n_trades]
+
+    # P&L = exit value - entry cost (straddle value at exit includes both
+    # the IV change and the underlying's move)
+    pnl = cost[exit_] - cost[entry]
+    # Straddle profits if price moves enough
+    move_pct = np.where(spot[entry] > 0, np.abs(spot[exit_] - spot[entry]) / spot[entry], 0.0)
+
+    trade_log = pd.DataFrame({
+        "EntryDate": trade_dates[entry],
+        "ExitDate": trade_dates[exit_],
+        "TckrSymb": symbols.take(entry),
+        "EntryIVRank": iv_rank[entry],
+        "ExitIVRank": iv_rank[exit_],
+        "EntryIV": avg_iv[entry],
+        "ExitIV": avg_iv[exit_],
+        "IVChange": avg_iv[exit_] - avg_iv[entry],
+        "EntryStraddleCost": cost[entry],
+        "ExitStraddleValue": cost[exit_],
+        "UndrlygMove_Pct": np.round(move_pct * 100, 2),
+        "DaysHeld": (dt_ns[exit_] - dt_ns[entry]) // DAY_NS,
+        "PnL": np.round(pnl, 2),
+        "PnL_Pct": np.round(pnl / cost[entry] * 100, 2),  # entries require cost > 0
+        "ExitReason": np.where(iv_rank[exit_] > IV_RANK_EXIT, "IV_Expansion", "MaxDays"),
+    })
+    trade_log.sort_values("EntryDate", kind="mergesort", inplace=True)
     trade_log.reset_index(drop=True, inplace=True)
 
     # Compute metrics
@@ -182,22 +286,23 @@ def run_iv_rank_backtest():
     print_metrics(metrics, "IV Rank Long Straddle")
 
     # Build equity curve
-    equity = trade_log[["ExitDate", "PnL"]].groupby("ExitDate")["PnL"].sum().reset_index()
+    equity = trade_log.groupby("ExitDate", observed=True)["PnL"].sum().reset_index()
     equity.columns = ["Date", "DailyPnL"]
     equity["CumulativePnL"] = equity["DailyPnL"].cumsum()
 
     # Save results
     results_dir = ensure_results_dir()
-    trade_log.to_csv(f"{results_dir}/ivr_trade_log.csv", index=False)
-    equity.to_csv(f"{results_dir}/ivr_equity_curve.csv", index=False)
+    save_csv(trade_log, f"{results_dir}/ivr_trade_log.csv")
+    save_csv(equity, f"{results_dir}/ivr_equity_curve.csv")
     print(f"\n  Trade log saved: {results_dir}/ivr_trade_log.csv")
     print(f"  Equity curve saved: {results_dir}/ivr_equity_curve.csv")
 
     # Print sample trades
-    display_cols = ["EntryDate", "TckrSymb", "EntryIVRank", "ExitIVRank",
-                    "EntryIV", "ExitIV", "DaysHeld", "PnL", "ExitReason"]
-    print(f"\n  Sample trades (first 15):")
-    print(trade_log[display_cols].head(15).to_string())
+    if VERBOSE:
+        display_cols = ["EntryDate", "TckrSymb", "EntryIVRank", "ExitIVRank",
+                        "EntryIV", "ExitIV", "DaysHeld", "PnL", "ExitReason"]
+        print(f"\n  Sample trades (first 15):")
+        print(trade_log[display_cols].head(15).to_string())
 
     # Summary by exit reason
     print(f"\n  Exit Reason Breakdown:")
@@ -7,8 +7,11 @@ Usage:
     python run_backtest.py
 """
 
+import io
 import sys
 import os
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -20,6 +23,31 @@ from iv_rank_strategy import run_iv_rank_backtest
 from utils import ensure_results_dir
 
 
+STRATEGIES = {
+    "ff": ("STRATEGY 1: FORWARD FACTOR CALENDAR SPREAD", "Forward Factor", run_forward_factor_backtest),
+    "ivr": ("STRATEGY 2: IV RANK LONG STRADDLE", "IV Rank", run_iv_rank_backtest),
+}
+
+
+def _run_captured(name, fn):
+    """
+    Process pool task: run one strategy with its stdout captured.
+    Returns (captured output, metrics); the trade log is already written
+    to the results dir, so only what main() prints is sent back. Errors
+    are reported in the output the same way main() used to print them.
+    """
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        try:
+            _, metrics = fn()
+        except Exception as e:
+            print(f"  ERROR running {name} strategy: {e}")
+            import traceback
+            traceback.print_exc(file=buf)
+            metrics = None
+    return buf.getvalue(), metrics
+
+
 def main():
     print("\n" + "#" * 70)
     print("#" + " " * 68 + "#")
@@ -29,31 +57,29 @@ def main():
 
     results_dir = ensure_results_dir()
 
-    # ── Strategy 1: Forward Factor Calendar Spread ──────────────────────
-    print("\n\n" + "=" * 70)
-    print("  STRATEGY 1: FORWARD FACTOR CALENDAR SPREAD")
-    print("=" * 70)
-
-    try:
-        ff_trades, ff_metrics = run_forward_factor_backtest()
-    except Exception as e:
-        print(f"  ERROR running Forward Factor strategy: {e}")
-        import traceback
-        traceback.print_exc()
-        ff_trades, ff_metrics = None, None
-
-    # ── Strategy 2: IV Rank Long Straddle ───────────────────────────────
-    print("\n\n" + "=" * 70)
-    print("  STRATEGY 2: IV RANK LONG STRADDLE")
-    print("=" * 70)
-
-    try:
-        ivr_trades, ivr_metrics = run_iv_rank_backtest()
-    except Exception as e:
-        print(f"  ERROR running IV Rank strategy: {e}")
-        import traceback
-        traceback.print_exc()
-        ivr_trades, ivr_metrics = None, None
+    # ── Run both strategies in parallel ─────────────────────────────────
+    # Each worker's output is captured and printed as one block, in
+    # STRATEGIES order, so the two logs don't interleave.
+    results = {}
+    with ProcessPoolExecutor(max_workers=len(STRATEGIES)) as ex:
+        futures = {key: ex.submit(_run_captured, name, fn)
+                   for key, (title, name, fn) in STRATEGIES.items()}
+        for key, fut in futures.items():
+            title, name, _ = STRATEGIES[key]
+            print("\n\n" + "=" * 70)
+            print(f"  {title}")
+            print("=" * 70)
+            try:
+                output, results[key] = fut.result()
+                print(output, end="")
+            except Exception as e:
+                print(f"  ERROR running {name} strategy: {e}")
+                import traceback
+                traceback.print_exc()
+                results[key] = None
+
+    ff_metrics = results["ff"]
+    ivr_metrics = results["ivr"]
 
     # ── Combined Summary ────────────────────────────────────────────────
     print("\n\n" + "#" * 70)
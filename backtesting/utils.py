@@ -2,11 +2,20 @@
 Shared utilities for option strategy backtesting.
 """
 
+import math
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import os
 import sys
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
+
 sys.stdout.reconfigure(encoding='utf-8')
 
 DATA_FILE = os.path.join(
@@ -15,12 +24,39 @@ DATA_FILE = os.path.join(
 )
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
 
+# Columns the strategies use; the cleaned cache stores only these
+LOAD_COLUMNS = ["TradDt", "XpryDt", "TckrSymb", "OptnTp", "StrkPric",
+                "UndrlygPric", "ClsPric", "T", "VI"]
+CATEGORY_COLUMNS = ["TckrSymb", "OptnTp"]
+
+# Fixed schema for the pyarrow CSV reader: dates parse as timestamps and
+# the category columns arrive dictionary-encoded (i.e. as categoricals)
+CSV_COLUMN_TYPES = {
+    "TradDt": pa.timestamp("ns"),
+    "XpryDt": pa.timestamp("ns"),
+    **{col: pa.dictionary(pa.int32(), pa.string()) for col in CATEGORY_COLUMNS},
+    **{col: pa.float64() for col in ["StrkPric", "UndrlygPric", "ClsPric", "T", "VI"]},
+}
+
+# Set BT_VERBOSE=1 to print sample trades in each strategy's log
+VERBOSE = os.getenv("BT_VERBOSE") == "1"
+
 
 def load_data(filepath=DATA_FILE):
-    """Load and preprocess the VI data."""
-    df = pd.read_csv(filepath)
-    df["TradDt"] = pd.to_datetime(df["TradDt"])
-    df["XpryDt"] = pd.to_datetime(df["XpryDt"])
+    """
+    Load and preprocess the VI data.
+    The cleaned frame is cached as Parquet beside the CSV (with TckrSymb and
+    OptnTp as categoricals) and reused for as long as it is newer than the CSV.
+    """
+    cache = os.path.splitext(filepath)[0] + "_clean.parquet"
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(filepath):
+        return pd.read_parquet(cache, columns=LOAD_COLUMNS, engine="pyarrow")
+
+    df = pa_csv.read_csv(
+        filepath,
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=LOAD_COLUMNS, column_types=CSV_COLUMN_TYPES),
+    ).to_pandas()
 
     # Keep only option rows (CE/PE) with valid VI
     df = df[df["OptnTp"].isin(["CE", "PE"])].copy()
@@ -30,21 +66,74 @@ def load_data(filepath=DATA_FILE):
     df = df[df["UndrlygPric"] > 0].copy()
     df = df[df["StrkPric"] > 0].copy()
 
+    # Dictionary order is first appearance; sort the categories so the
+    # sorts below order symbols alphabetically
+    for col in CATEGORY_COLUMNS:
+        cats = df[col].cat.remove_unused_categories()
+        df[col] = cats.cat.reorder_categories(sorted(cats.cat.categories))
+
     df.sort_values(["TradDt", "TckrSymb", "OptnTp", "XpryDt", "StrkPric"], inplace=True)
     df.reset_index(drop=True, inplace=True)
 
+    # Write-then-rename, so a concurrently running strategy never reads a partial file
+    tmp = f"{cache}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, engine="pyarrow", compression="zstd", index=False)
+    os.replace(tmp, cache)
+
     return df
 
 
+def category_codes(col):
+    """
+    Integer group codes for a column: the categorical codes when it is a
+    categorical (as load_data() returns TckrSymb / OptnTp), else pd.factorize.
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy()
+    return pd.factorize(col)[0]
+
+
+def segment_starts(df, keys):
+    """
+    Positions where any of `keys` differs from the previous row, i.e. the
+    first row of every group when df is sorted by those keys.
+    Categorical keys are compared by their integer codes.
+    """
+    n = len(df)
+    change = np.zeros(n, dtype=bool)
+    if n:
+        change[0] = True
+    for key in keys:
+        col = df[key]
+        values = col.cat.codes.to_numpy() if isinstance(col.dtype, pd.CategoricalDtype) else col.to_numpy()
+        change[1:] |= values[1:] != values[:-1]
+    return np.flatnonzero(change)
+
+
 def get_atm_options(df):
     """
     For each (TradDt, TckrSymb, OptnTp, XpryDt), pick the row
     where StrkPric is closest to UndrlygPric.
+    One stable sort by the group keys makes every group a contiguous
+    segment; np.minimum.reduceat then finds each segment's minimum
+    distance, and the first row reaching it wins (ties as with idxmin).
+    NaN distances are skipped as idxmin does; a group with no finite
+    distance has no ATM row and is dropped.
     """
-    df = df.copy()
-    df["_dist"] = abs(df["StrkPric"] - df["UndrlygPric"])
-    idx = df.groupby(["TradDt", "TckrSymb", "OptnTp", "XpryDt"])["_dist"].idxmin()
-    atm = df.loc[idx].drop(columns=["_dist"]).copy()
+    keys = ["TradDt", "TckrSymb", "OptnTp", "XpryDt"]
+    df = df.sort_values(keys, kind="mergesort")  # no-op order for load_data() output
+    n = len(df)
+    if n == 0:
+        return df.reset_index(drop=True)
+
+    starts = segment_starts(df, keys)
+    dist = np.abs(df["StrkPric"].to_numpy() - df["UndrlygPric"].to_numpy())
+    dist = np.where(np.isnan(dist), np.inf, dist)  # idxmin skips NaN
+    seg_min = np.minimum.reduceat(dist, starts)
+    hits = np.flatnonzero(dist == np.repeat(seg_min, np.diff(np.append(starts, n))))
+
+    first = hits[np.searchsorted(hits, starts)]
+    atm = df.iloc[first[np.isfinite(seg_min)]]
     atm.reset_index(drop=True, inplace=True)
     return atm
 
@@ -71,25 +160,68 @@ def compute_forward_factor(v1, t1, v2, t2):
     v2 = np.asarray(v2, dtype=float)
     t2 = np.asarray(t2, dtype=float)
 
-    dt = t2 - t1
+    if njit is not None and v1.ndim == 1 and v1.shape == t1.shape == v2.shape == t2.shape:
+        ff = np.empty_like(v1)
+        forward_vol = np.empty_like(v1)
+        _ff_kernel(v1, t1, v2, t2, ff, forward_vol)
+        return ff, forward_vol
+
+    # Straight-line NumPy: evaluate every row on safe operands in a few
+    # reused buffers, then blank the undefined rows (no warnings, no branches)
+    shape = np.broadcast_shapes(v1.shape, t1.shape, v2.shape, t2.shape)
+    dt = np.subtract(t2, t1, out=np.empty(shape))
     # Guard against zero or negative dt
     valid = dt > 1e-6
+    dt[~valid] = 1.0
 
-    forward_var = np.where(valid, (v2**2 * t2 - v1**2 * t1) / dt, np.nan)
+    forward_var = np.multiply(v2, v2, out=np.empty(shape))
+    forward_var *= t2
+    forward_var -= v1**2 * t1
+    forward_var /= dt
 
     # Forward variance can be negative if term structure is inverted
     # In that case, forward vol is undefined
-    fv_positive = forward_var > 0
-    forward_vol = np.where(fv_positive, np.sqrt(forward_var), np.nan)
+    valid &= forward_var > 0
+    forward_vol = np.maximum(forward_var, 0.0, out=forward_var)
+    np.sqrt(forward_vol, out=forward_vol)
 
     # Forward Factor
-    ff = np.where(np.isfinite(forward_vol) & (forward_vol > 1e-8),
-                  (v1 / forward_vol) - 1.0,
-                  np.nan)
+    ff_valid = valid & np.isfinite(forward_vol) & (forward_vol > 1e-8)
+    ff = np.maximum(forward_vol, 1e-8, out=dt)
+    np.divide(v1, ff, out=ff)
+    ff -= 1.0
+
+    forward_vol[~valid] = np.nan
+    ff[~ff_valid] = np.nan
 
     return ff, forward_vol
 
 
+def _ff_kernel(v1, t1, v2, t2, out_ff, out_fv):
+    """
+    Single-pass compute_forward_factor for 1-D arrays, compiled with Numba
+    when available; writes FF and forward vol (NaN where undefined).
+    """
+    for i in prange(v1.shape[0]):
+        dt = t2[i] - t1[i]
+        fv = np.nan
+        ff = np.nan
+        if dt > 1e-6:
+            forward_var = (v2[i] * v2[i] * t2[i] - v1[i] * v1[i] * t1[i]) / dt
+            if forward_var > 0:
+                fv = math.sqrt(forward_var)
+                if fv > 1e-8:
+                    ff = v1[i] / fv - 1.0
+        out_fv[i] = fv
+        out_ff[i] = ff
+
+
+if njit is not None:
+    # No fastmath: FMA contraction would let FF near a threshold round
+    # differently from the NumPy path
+    _ff_kernel = njit(parallel=True, cache=True)(_ff_kernel)
+
+
 def calc_metrics(pnl_series, capital=100000):
     """
     Calculate performance metrics from a P&L series.
@@ -115,28 +247,36 @@ def calc_metrics(pnl_series, capital=100000):
             "profit_factor": 0,
         }
 
-    total_pnl = np.sum(pnl)
-    avg_pnl = np.mean(pnl)
-    wins = pnl[pnl > 0]
-    losses = pnl[pnl <= 0]
-    win_rate = len(wins) / len(pnl) * 100 if len(pnl) > 0 else 0
+    if njit is not None:
+        total_pnl, std, n_wins, gross_profit, n_losses, loss_sum, max_dd = _metrics_kernel(
+            pnl, float(capital))
+    else:
+        total_pnl = np.sum(pnl)
+        std = np.std(pnl)
+        wins = pnl[pnl > 0]
+        losses = pnl[pnl <= 0]
+        n_wins, gross_profit = len(wins), np.sum(wins)
+        n_losses, loss_sum = len(losses), np.sum(losses)
+
+        # Max Drawdown from cumulative equity
+        equity = np.cumsum(pnl) + capital
+        peak = np.maximum.accumulate(equity)
+        max_dd = np.max((peak - equity) / peak)
+
+    avg_pnl = total_pnl / len(pnl)
+    win_rate = n_wins / len(pnl) * 100
 
     # Sharpe (annualized, assuming ~252 trades/year as rough proxy)
-    if np.std(pnl) > 0:
-        sharpe = (np.mean(pnl) / np.std(pnl)) * np.sqrt(min(252, len(pnl)))
+    if std > 0:
+        sharpe = (avg_pnl / std) * np.sqrt(min(252, len(pnl)))
     else:
         sharpe = 0
 
     # Profit Factor
-    gross_profit = np.sum(wins) if len(wins) > 0 else 0
-    gross_loss = abs(np.sum(losses)) if len(losses) > 0 else 1e-8
-    profit_factor = gross_profit / gross_loss
+    gross_loss = abs(loss_sum) if n_losses > 0 else 1e-8
+    profit_factor = np.float64(gross_profit) / gross_loss  # inf, not ZeroDivisionError, for 0-PnL losers
 
-    # Max Drawdown from cumulative equity
-    equity = np.cumsum(pnl) + capital
-    peak = np.maximum.accumulate(equity)
-    drawdown = (peak - equity) / peak
-    max_dd = np.max(drawdown) * 100
+    max_dd = max_dd * 100
 
     return {
         "total_trades": len(pnl),
@@ -149,6 +289,47 @@ def calc_metrics(pnl_series, capital=100000):
     }
 
 
+def _metrics_kernel(pnl, capital):
+    """
+    One pass over pnl for calc_metrics, compiled with Numba when available.
+    Returns (total, population std, n_wins, win sum, n_losses, loss sum,
+    max drawdown fraction); the std uses Welford's update.
+    """
+    total = 0.0
+    mean = 0.0
+    m2 = 0.0
+    n_wins = 0
+    win_sum = 0.0
+    n_losses = 0
+    loss_sum = 0.0
+    peak = -np.inf
+    max_dd = 0.0
+    for i in range(pnl.shape[0]):
+        x = pnl[i]
+        total += x
+        delta = x - mean
+        mean += delta / (i + 1)
+        m2 += delta * (x - mean)
+        if x > 0:
+            n_wins += 1
+            win_sum += x
+        else:
+            n_losses += 1
+            loss_sum += x
+
+        equity = total + capital  # as np.cumsum(pnl) + capital
+        if equity > peak:
+            peak = equity
+        dd = (peak - equity) / peak
+        if dd > max_dd:
+            max_dd = dd
+    return total, math.sqrt(m2 / pnl.shape[0]), n_wins, win_sum, n_losses, loss_sum, max_dd
+
+
+if njit is not None:
+    _metrics_kernel = njit(cache=True)(_metrics_kernel)
+
+
 def print_metrics(metrics, strategy_name="Strategy"):
     """Pretty-print performance metrics."""
     print(f"\n{'='*60}")
@@ -169,3 +350,17 @@ def ensure_results_dir():
     """Create results directory if it doesn't exist."""
     os.makedirs(RESULTS_DIR, exist_ok=True)
     return RESULTS_DIR
+
+
+def save_csv(df, path):
+    """
+    Write df to CSV with pyarrow's writer (much faster than DataFrame.to_csv).
+    Datetime columns holding whole days are written as dates, matching
+    the YYYY-MM-DD output of to_csv.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        col = df[name]
+        if pd.api.types.is_datetime64_any_dtype(col) and not (col.dt.normalize() != col).any():
+            table = table.set_column(i, name, table.column(i).cast(pa.date32()))
+    pa_csv.write_csv(table, path)
@@ -1,13 +1,14 @@
+import io
 import pandas as pd
 import os
 import glob
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 
 # Paths
 raw_dir = "D:/Antigravity/option_data/"
 clean_dir = "D:/Antigravity/option_data/clean_data/"
 
-os.makedirs(clean_dir, exist_ok=True)
-
 
 def clean_bhavcopy(input_path, output_path):
     """Clean a single F&O bhavcopy CSV file.
@@ -20,22 +21,25 @@ def clean_bhavcopy(input_path, output_path):
     df = pd.read_csv(input_path)
     original_shape = df.shape
 
+    # One 2D null mask serves both steps 1 and 2
+    null = df.isna().to_numpy()
+
     # Step 1: Drop columns that are completely empty
-    empty_cols = [col for col in df.columns if df[col].isnull().all()]
-    df = df.drop(columns=empty_cols)
+    empty = null.all(axis=0)
+    empty_cols = list(df.columns[empty])
+    df = df.loc[:, ~empty]
     print(f"  Dropped {len(empty_cols)} empty columns: {empty_cols}")
 
     # Step 2: Drop rows with any null values
-    null_rows = df.isnull().any(axis=1).sum()
-    df = df.dropna()
-    print(f"  Dropped {null_rows} rows with null values")
+    null_mask = null[:, ~empty].any(axis=1)
+    df = df[~null_mask]
+    print(f"  Dropped {null_mask.sum()} rows with null values")
 
     # Step 3: Drop rows with 0 in any numeric column
-    numeric_cols = df.select_dtypes(include="number").columns
-    zero_mask = (df[numeric_cols] == 0).any(axis=1)
-    zero_rows = zero_mask.sum()
+    numeric = df.select_dtypes(include="number").to_numpy(copy=False)
+    zero_mask = (numeric == 0).any(axis=1)
     df = df[~zero_mask]
-    print(f"  Dropped {zero_rows} rows with 0 values in numeric columns")
+    print(f"  Dropped {zero_mask.sum()} rows with 0 values in numeric columns")
 
     # Save
     df.to_csv(output_path, index=False)
@@ -44,24 +48,47 @@ def clean_bhavcopy(input_path, output_path):
     return df
 
 
-# Process all CSV files in option_data folder
-csv_files = sorted(glob.glob(os.path.join(raw_dir, "fo*.csv")))
-print(f"Found {len(csv_files)} CSV files to process.\n")
-
-for i, input_file in enumerate(csv_files, 1):
+def _process_one(input_file):
+    """
+    Process pool task: clean one file with its log captured.
+    Returns (basename, ok, log) so the parent prints each file's log whole.
+    """
     basename = os.path.basename(input_file)
     output_file = os.path.join(clean_dir, f"processed_{basename}")
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        try:
+            clean_bhavcopy(input_file, output_file)
+            ok = True
+        except Exception as e:
+            print(f"  ERROR: {e}")
+            ok = False
+    return basename, ok, buf.getvalue()
+
+
+if __name__ == "__main__":
+    os.makedirs(clean_dir, exist_ok=True)
+
+    # Process all CSV files in option_data folder
+    csv_files = sorted(glob.glob(os.path.join(raw_dir, "fo*.csv")))
+    print(f"Found {len(csv_files)} CSV files to process.\n")
 
     # Skip if already processed
-    if os.path.isfile(output_file):
-        print(f"[{i}/{len(csv_files)}] Skipping (already exists): {basename}")
-        continue
-
-    print(f"[{i}/{len(csv_files)}] Processing: {basename}")
-    try:
-        clean_bhavcopy(input_file, output_file)
-    except Exception as e:
-        print(f"  ERROR: {e}")
-    print()
-
-print("All done!")
+    todo = []
+    for i, input_file in enumerate(csv_files, 1):
+        basename = os.path.basename(input_file)
+        if os.path.isfile(os.path.join(clean_dir, f"processed_{basename}")):
+            print(f"[{i}/{len(csv_files)}] Skipping (already exists): {basename}")
+        else:
+            todo.append(input_file)
+
+    # Files are independent: clean them in parallel, logging in input order
+    failed = []
+    with ProcessPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as ex:
+        for i, (basename, ok, log) in enumerate(ex.map(_process_one, todo, chunksize=1), 1):
+            print(f"[{i}/{len(todo)}] Processing: {basename}")
+            print(log)
+            if not ok:
+                failed.append(basename)
+
+    print(f"All done! ({len(failed)} failed: {failed})" if failed else "All done!")
@@ -2,71 +2,291 @@
 Compute Implied Volatility (IV) and Greeks for F&O option data
 using the Black-Scholes model.
 
-OPTIMIZED: Uses multiprocessing for parallel IV computation + vectorized Greeks.
+OPTIMIZED: Vectorized IV solver (Chandrupatla, all rows at once) + vectorized Greeks.
 
-Reads:  master/master_fo_data.csv
-Writes: master/master_fo_data_with_greeks.csv
+Reads:  master/master_fo_data.parquet (master/master_fo_data.csv if absent)
+Writes: master/master_fo_data_with_greeks.parquet
+        (+ .csv when GREEKS_CSV=1)
 
 New columns: IV, Delta, Gamma, Vega, Theta, Rho, Moneyness
 """
 
 import numpy as np
 import pandas as pd
-from scipy.optimize import brentq
-from scipy.stats import norm
-import multiprocessing as mp
-import time
-import warnings
+from scipy.special import ndtr
+import math
 import os
+import time
 
-warnings.filterwarnings("ignore")
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+    prange = range
 
 # ── Constants ────────────────────────────────────────────────
 RISK_FREE_RATE = 0.068
 DIVIDEND_YIELD = 0.0
 IV_LOWER = 0.001
 IV_UPPER = 5.0
-
-INPUT_FILE = "D:/antigravity/option_data/master/master_fo_data.csv"
-OUTPUT_FILE = "D:/antigravity/option_data/master/master_fo_data_with_greeks.csv"
-
-N_WORKERS = max(1, os.cpu_count() - 1)  # Leave 1 core free
-
-
-# ── IV Solver (scalar, called per row in parallel) ───────────
-
-def _bs_price(S, K, T, r, q, sigma, is_call):
-    sqrt_T = np.sqrt(T)
-    d1 = (np.log(S / K) + (r - q + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
-    d2 = d1 - sigma * sqrt_T
-    if is_call:
-        return S * np.exp(-q * T) * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
-    else:
-        return K * np.exp(-r * T) * norm.cdf(-d2) - S * np.exp(-q * T) * norm.cdf(-d1)
-
-
-def _solve_iv(args):
-    """Solve IV for one row. Designed for use with multiprocessing Pool."""
-    S, K, T, r, q, mkt_price, is_call = args
-    if T <= 0 or mkt_price <= 0 or S <= 0 or K <= 0:
-        return np.nan
-    try:
-        f_lo = _bs_price(S, K, T, r, q, IV_LOWER, is_call) - mkt_price
-        f_hi = _bs_price(S, K, T, r, q, IV_UPPER, is_call) - mkt_price
-        if f_lo * f_hi > 0:
-            return np.nan
-        return brentq(lambda sig: _bs_price(S, K, T, r, q, sig, is_call) - mkt_price,
-                      IV_LOWER, IV_UPPER, maxiter=100, xtol=1e-8)
-    except (ValueError, RuntimeError):
-        return np.nan
-
-
-def _solve_iv_chunk(chunk_args):
-    """Process a chunk of rows and return IV array. Used to reduce IPC overhead."""
-    results = []
-    for args in chunk_args:
-        results.append(_solve_iv(args))
-    return results
+# Tighter than the VI rescue solve in calculate_vi_2024.py (1e-6, 30 steps):
+# these mirror the per-row brentq's xtol/maxiter this solver replaced, so
+# the Greeks stay at parity with the brentq output
+IV_XTOL = 1e-8          # absolute tolerance on sigma
+IV_MAXITER = 100
+IV_BLOCK_ROWS = 1 << 18 # rows per vectorized solve
+IV_SEED_BAND = (0.3, 3.0)   # kernel's first bracket, as multiples of the Brenner-Subrahmanyam seed
+IV_NUMBA_MIN_ROWS = 100_000  # below this, loading the Numba kernel costs more than it saves
+DTYPE = np.float32      # Greeks working/output type (the IV solve stays float64)
+
+SQRT_2PI = math.sqrt(2 * math.pi)
+INV_SQRT_2PI = 1.0 / SQRT_2PI
+INV_SQRT_2 = 1.0 / math.sqrt(2)
+
+INPUT_FILE = "D:/antigravity/option_data/master/master_fo_data.parquet"
+INPUT_CSV_FILE = "D:/antigravity/option_data/master/master_fo_data.csv"
+OUTPUT_FILE = "D:/antigravity/option_data/master/master_fo_data_with_greeks.parquet"
+OUTPUT_CSV_FILE = "D:/antigravity/option_data/master/master_fo_data_with_greeks.csv"
+
+# Declared types for the CSV fallback (the Parquet copy is already typed)
+CSV_DTYPES = {
+    "OptnTp": str,
+    "StrkPric": "float64",
+    "UndrlygPric": "float64",
+    "ClsPric": "float64",
+    "SttlmPric": "float64",
+}
+DATE_COLUMNS = ["TradDt", "XpryDt"]
+
+# Output column order of the Greeks, as returned by compute_greeks_vectorized
+GREEK_COLUMNS = ["Delta", "Gamma", "Vega", "Theta", "Rho"]
+
+# Set GREEKS_CSV=1 to also export the result as CSV
+WRITE_CSV = os.getenv("GREEKS_CSV") == "1"
+
+
+# ── IV Solver (vectorized over all rows) ─────────────────────
+
+def _bs_price(sigma, S_fwd, K_disc, log_moneyness, T, sqrt_T, theta):
+    """
+    Black-Scholes price for arrays; theta = +1 for calls, -1 for puts.
+    S_fwd = S*e^(-qT), K_disc = K*e^(-rT), log_moneyness = log(S/K) + (r-q)T.
+    """
+    vol_t = sigma * sqrt_T
+    d1 = (log_moneyness + 0.5 * sigma * sigma * T) / vol_t
+    d2 = d1 - vol_t
+    return theta * (S_fwd * ndtr(theta * d1) - K_disc * ndtr(theta * d2))
+
+
+def solve_iv_vectorized(S, K, T, r, q, mkt_price, is_call, lo=IV_LOWER, hi=IV_UPPER,
+                        xtol=IV_XTOL, maxiter=IV_MAXITER, block_size=IV_BLOCK_ROWS):
+    """
+    Implied volatility for every row at once with a vectorized Chandrupatla
+    bracketing solver on BS(sigma) - mkt_price over [lo, hi] (the bracket
+    the per-row brentq used). Each step is inverse quadratic interpolation
+    where the bracket allows it and bisection otherwise; all rows advance
+    in lockstep under masks until every bracket is narrower than ~2*xtol.
+    Inputs longer than block_size are solved block by block.
+    Returns IV array, NaN for invalid inputs or when no root lies in [lo, hi].
+    """
+    n = len(mkt_price)
+    if n > block_size:
+        out = np.empty(n)
+        for start in range(0, n, block_size):
+            blk = slice(start, start + block_size)
+            out[blk] = solve_iv_vectorized(S[blk], K[blk], T[blk], r, q, mkt_price[blk],
+                                           is_call[blk], lo, hi, xtol, maxiter, block_size)
+        return out
+
+    eps = np.finfo(np.float64).eps
+    valid = (T > 0) & (mkt_price > 0) & (S > 0) & (K > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Loop invariants
+        theta = np.where(is_call, 1.0, -1.0)
+        sqrt_T = np.sqrt(T)
+        S_fwd = S * np.exp(-q * T)
+        K_disc = K * np.exp(-r * T)
+        log_moneyness = np.log(S / K) + (r - q) * T
+
+        def residual(sigma):
+            return _bs_price(sigma, S_fwd, K_disc, log_moneyness, T, sqrt_T, theta) - mkt_price
+
+        # x1 is the newest point, [x1, x2] brackets the root, x3 is the previous x1 or x2
+        f1 = residual(np.full(n, lo))
+        f2 = residual(np.full(n, hi))
+        # BS is increasing in sigma, so a sign change means f(lo) <= 0 <= f(hi)
+        rows = np.flatnonzero(valid & (f1 <= 0) & (f2 >= 0))
+
+        # Iterate only on rows with a root; the rest stay NaN
+        out = np.full(n, np.nan)
+        if len(rows) == 0:
+            return out
+        theta, sqrt_T, S_fwd, K_disc, log_moneyness, T, mkt_price, f1, f2 = (
+            a[rows] for a in (theta, sqrt_T, S_fwd, K_disc, log_moneyness, T, mkt_price, f1, f2))
+        m = len(rows)
+        x1 = np.full(m, lo)
+        x2 = np.full(m, hi)
+        x3, f3 = x2.copy(), f2.copy()
+        done = np.zeros(m, dtype=bool)
+        t = np.full(m, 0.5)
+
+        for _ in range(maxiter):
+            xt = x1 + t * (x2 - x1)
+            ft = residual(xt)
+
+            # Keep the root bracketed: xt replaces x1 if f has the same sign there, else x2 <- x1
+            same = np.sign(ft) == np.sign(f1)
+            live = ~done
+            x3 = np.where(live, np.where(same, x1, x2), x3)
+            f3 = np.where(live, np.where(same, f1, f2), f3)
+            x2 = np.where(live & ~same, x1, x2)
+            f2 = np.where(live & ~same, f1, f2)
+            x1 = np.where(live, xt, x1)
+            f1 = np.where(live, ft, f1)
+
+            use_x1 = np.abs(f1) < np.abs(f2)
+            xm = np.where(use_x1, x1, x2)
+            fm = np.where(use_x1, f1, f2)
+            tlim = (2 * eps * np.abs(xm) + xtol) / np.abs(x2 - x1)
+            done |= (tlim > 0.5) | (fm == 0)
+            if done.all():
+                break
+
+            # Inverse quadratic interpolation only where it stays inside the bracket
+            xi = (x1 - x2) / (x3 - x2)
+            phi = (f1 - f2) / (f3 - f2)
+            iqi = (1 - np.sqrt(1 - xi) < phi) & (phi < np.sqrt(xi))
+            t_iqi = (f1 / (f2 - f1) * f3 / (f2 - f3)
+                     + (x3 - x1) / (x2 - x1) * f1 / (f3 - f1) * f2 / (f3 - f2))
+            t = np.clip(np.where(iqi, t_iqi, 0.5), tlim, 1 - tlim)
+
+        out[rows] = np.where(np.abs(f1) < np.abs(f2), x1, x2)
+    return out
+
+
+# ── Numba IV Kernel ──────────────────────────────────────────
+
+def _bs_price_scalar(sigma, S_fwd, K_disc, log_moneyness, T, sqrt_T, theta):
+    """Scalar _bs_price for the Numba kernel; N(x) = 0.5 * erfc(-x / sqrt(2))."""
+    vol_t = sigma * sqrt_T
+    d1 = (log_moneyness + 0.5 * sigma * sigma * T) / vol_t
+    d2 = d1 - vol_t
+    return theta * (S_fwd * 0.5 * math.erfc(-theta * d1 * INV_SQRT_2)
+                    - K_disc * 0.5 * math.erfc(-theta * d2 * INV_SQRT_2))
+
+
+def _greeks_scalar(sigma, s, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta, r, q):
+    """
+    Scalar compute_greeks_vectorized for the Numba kernel, with the spot s
+    and the _bs_price_scalar inputs. Returns (delta, gamma, vega, theta, rho).
+    """
+    vol_t = sigma * sqrt_t
+    d1 = (log_moneyness + 0.5 * sigma * sigma * t) / vol_t
+    d2 = d1 - vol_t
+    phi_d1 = math.exp(-0.5 * d1 * d1) * INV_SQRT_2PI
+    n_d1 = 0.5 * math.erfc(-theta * d1 * INV_SQRT_2)  # N(theta * d1)
+    n_d2 = 0.5 * math.erfc(-theta * d2 * INV_SQRT_2)  # N(theta * d2)
+    exp_qt = s_fwd / s
+    delta = theta * exp_qt * n_d1
+    gamma = exp_qt * phi_d1 / (s * vol_t)
+    vega = s_fwd * phi_d1 * sqrt_t / 100.0
+    theta_day = (-(s_fwd * phi_d1 * sigma) / (2 * sqrt_t)
+                 - theta * r * k_disc * n_d2 + theta * q * s_fwd * n_d1) / 365.0
+    rho = theta * k_disc * t * n_d2 / 100.0
+    return delta, gamma, vega, theta_day, rho
+
+
+def _iv_greeks_kernel(S, K, T, r, q, mkt_price, is_call, lo, hi, xtol, maxiter,
+                      iv_out, delta_out, gamma_out, vega_out, theta_out, rho_out):
+    """
+    Per-row Chandrupatla IV solver (see solve_iv_vectorized) fused with the
+    Greeks at the solved IV, compiled with Numba when available. Rows run in
+    parallel with the bracket state in scalar locals, so no per-iteration
+    temporaries are allocated. Each row starts from a bracket around its
+    Brenner-Subrahmanyam seed rather than the full [lo, hi].
+    Writes IV and Greeks (NaN for invalid inputs or no root in [lo, hi])
+    to the *_out arrays.
+    """
+    eps = 2.220446049250313e-16
+    for i in prange(S.shape[0]):
+        iv_out[i] = np.nan
+        delta_out[i] = gamma_out[i] = vega_out[i] = theta_out[i] = rho_out[i] = np.nan
+        s, k, t, price = S[i], K[i], T[i], mkt_price[i]
+        if not (t > 0 and price > 0 and s > 0 and k > 0):
+            continue
+
+        theta = 1.0 if is_call[i] else -1.0
+        sqrt_t = math.sqrt(t)
+        s_fwd = s * math.exp(-q * t)
+        k_disc = k * math.exp(-r * t)
+        log_moneyness = math.log(s / k) + (r - q) * t
+
+        # Start from [a, b] around the Brenner-Subrahmanyam seed sqrt(2*pi/T) * price / S,
+        # widening to [lo, a] or [b, hi] when the root lies outside it
+        sigma0 = SQRT_2PI / sqrt_t * price / s
+        a = min(max(IV_SEED_BAND[0] * sigma0, lo), hi)
+        b = min(max(IV_SEED_BAND[1] * sigma0, lo), hi)
+        fa = _bs_price_scalar(a, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta) - price
+        if fa > 0:
+            x1, x2 = lo, a
+            f1 = _bs_price_scalar(lo, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta) - price
+            f2 = fa
+        else:
+            fb = _bs_price_scalar(b, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta) - price
+            if fb < 0:
+                x1, x2 = b, hi
+                f1 = fb
+                f2 = _bs_price_scalar(hi, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta) - price
+            else:
+                x1, x2, f1, f2 = a, b, fa, fb
+        if not (f1 <= 0 and f2 >= 0):
+            continue
+        x3, f3 = x2, f2
+        step = 0.5
+
+        for _ in range(maxiter):
+            xt = x1 + step * (x2 - x1)
+            ft = _bs_price_scalar(xt, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta) - price
+
+            # Keep the root bracketed: xt replaces x1 if f has the same sign there, else x2 <- x1
+            if (ft > 0) == (f1 > 0) and (ft < 0) == (f1 < 0):
+                x3, f3 = x1, f1
+            else:
+                x3, f3 = x2, f2
+                x2, f2 = x1, f1
+            x1, f1 = xt, ft
+
+            if abs(f1) < abs(f2):
+                xm, fm = x1, f1
+            else:
+                xm, fm = x2, f2
+            tlim = (2 * eps * abs(xm) + xtol) / abs(x2 - x1)
+            if tlim > 0.5 or fm == 0:
+                break
+
+            # Inverse quadratic interpolation only where it stays inside the bracket
+            xi = (x1 - x2) / (x3 - x2)
+            phi = (f1 - f2) / (f3 - f2)
+            if 1 - math.sqrt(1 - xi) < phi < math.sqrt(xi):
+                step = (f1 / (f2 - f1) * f3 / (f2 - f3)
+                        + (x3 - x1) / (x2 - x1) * f1 / (f3 - f1) * f2 / (f3 - f2))
+            else:
+                step = 0.5
+            step = min(max(step, tlim), 1 - tlim)
+
+        sigma = x1 if abs(f1) < abs(f2) else x2
+        iv_out[i] = sigma
+        delta_out[i], gamma_out[i], vega_out[i], theta_out[i], rho_out[i] = _greeks_scalar(
+            sigma, s, s_fwd, k_disc, log_moneyness, t, sqrt_t, theta, r, q)
+
+
+if njit is not None:
+    # fastmath without nnan/ninf: NaN prices must still fail the validity test
+    _FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+    _bs_price_scalar = njit(fastmath=_FASTMATH, cache=True)(_bs_price_scalar)
+    _greeks_scalar = njit(fastmath=_FASTMATH, cache=True)(_greeks_scalar)
+    _iv_greeks_kernel = njit(parallel=True, fastmath=_FASTMATH, cache=True)(_iv_greeks_kernel)
 
 
 # ── Vectorized Greeks ────────────────────────────────────────
@@ -83,112 +303,134 @@ def compute_greeks_vectorized(S, K, T, r, q, sigma, is_call):
         return delta, gamma, vega, theta, rho
 
     Sv, Kv, Tv, sigv = S[valid], K[valid], T[valid], sigma[valid]
-    is_call_v = is_call[valid]
+    # theta = +1 for calls, -1 for puts: N(theta*d) covers both legs with one ndtr each
+    w = np.where(is_call[valid], 1.0, -1.0).astype(sigv.dtype)
 
+    # Temporaries are reused in place, so each expression is one pass over Nv values
     sqrt_T = np.sqrt(Tv)
-    d1 = (np.log(Sv / Kv) + (r - q + 0.5 * sigv**2) * Tv) / (sigv * sqrt_T)
-    d2 = d1 - sigv * sqrt_T
+    vol_t = sigv * sqrt_T
+    d1 = np.log(Sv / Kv)
+    d1 += (r - q + 0.5 * sigv * sigv) * Tv
+    d1 /= vol_t
+    phi_d1 = np.exp(-0.5 * d1 * d1)
+    phi_d1 *= INV_SQRT_2PI
+    n_d1 = ndtr(w * d1)
+    d1 -= vol_t  # now d2
+    n_d2 = ndtr(w * d1)
 
     exp_qT = np.exp(-q * Tv)
-    exp_rT = np.exp(-r * Tv)
-    phi_d1 = norm.pdf(d1)
-    Nd1 = norm.cdf(d1)
-    Nd2 = norm.cdf(d2)
-    Nmd1 = norm.cdf(-d1)
-    Nmd2 = norm.cdf(-d2)
-
-    gamma[valid] = exp_qT * phi_d1 / (Sv * sigv * sqrt_T)
-    vega[valid] = Sv * exp_qT * phi_d1 * sqrt_T / 100.0
-    delta[valid] = np.where(is_call_v, exp_qT * Nd1, exp_qT * (Nd1 - 1))
-
-    common_theta = -(Sv * phi_d1 * sigv * exp_qT) / (2 * sqrt_T)
-    theta_call = common_theta - r * Kv * exp_rT * Nd2 + q * Sv * exp_qT * Nd1
-    theta_put = common_theta + r * Kv * exp_rT * Nmd2 - q * Sv * exp_qT * Nmd1
-    theta[valid] = np.where(is_call_v, theta_call, theta_put) / 365.0
-
-    rho_call = Kv * Tv * exp_rT * Nd2 / 100.0
-    rho_put = -Kv * Tv * exp_rT * Nmd2 / 100.0
-    rho[valid] = np.where(is_call_v, rho_call, rho_put)
+    S_fwd = Sv * exp_qT
+    K_disc = np.exp(-r * Tv)
+    K_disc *= Kv
+    S_phi = S_fwd * phi_d1
+
+    gamma[valid] = exp_qT * phi_d1 / (Sv * vol_t)
+    vega[valid] = S_phi * sqrt_T / 100.0
+    exp_qT *= w * n_d1
+    delta[valid] = exp_qT
+
+    n_d2 *= w
+    K_disc *= n_d2  # theta * K e^(-rT) N(theta*d2)
+    S_fwd *= w * n_d1  # theta * S e^(-qT) N(theta*d1)
+    S_phi *= sigv
+    S_phi /= -2 * sqrt_T
+    S_phi += q * S_fwd - r * K_disc
+    theta[valid] = S_phi / 365.0
+    K_disc *= Tv
+    rho[valid] = K_disc / 100.0
 
     return delta, gamma, vega, theta, rho
 
 
+# ── Row dedup ────────────────────────────────────────────────
+
+def _distinct_rows(*cols):
+    """
+    Returns (first, inverse): the first row of each distinct key tuple and,
+    for every row, its position in that list, so a[first][inverse] == a.
+    Keys compare exactly (NaN equal to NaN). Both are slice(None) when no
+    row repeats, so indexing with them is a free view.
+    """
+    keys = pd.DataFrame(dict(enumerate(cols)))
+    dup = keys.duplicated().to_numpy()
+    if not dup.any():
+        return slice(None), slice(None)
+    # sort=False numbers groups by first appearance, matching the order of ~dup
+    inverse = keys.groupby(list(keys.columns), sort=False, dropna=False).ngroup().to_numpy()
+    return np.flatnonzero(~dup), inverse
+
+
 # ── Main ─────────────────────────────────────────────────────
 
 def main():
     print("=" * 60)
-    print("  Black-Scholes IV & Greeks (Multiprocessing)")
-    print(f"  Workers: {N_WORKERS}")
+    print(f"  Black-Scholes IV & Greeks ({'Numba' if njit is not None else 'Vectorized'})")
     print("=" * 60)
 
     r, q = RISK_FREE_RATE, DIVIDEND_YIELD
 
-    # Load data
-    print(f"\nLoading: {INPUT_FILE}")
+    # Load data (Parquet written by master_script.py, else the CSV)
     t0 = time.time()
-    df = pd.read_csv(INPUT_FILE)
+    if os.path.exists(INPUT_FILE):
+        print(f"\nLoading: {INPUT_FILE}")
+        df = pd.read_parquet(INPUT_FILE, engine="pyarrow", memory_map=True)
+    else:
+        print(f"\nLoading: {INPUT_CSV_FILE}")
+        df = pd.read_csv(INPUT_CSV_FILE, dtype=CSV_DTYPES, parse_dates=DATE_COLUMNS, engine="c")
+    for col in DATE_COLUMNS:
+        if not pd.api.types.is_datetime64_any_dtype(df[col]):  # older Parquet copies hold strings
+            df[col] = pd.to_datetime(df[col])
     print(f"Loaded {len(df):,} rows in {time.time()-t0:.1f}s")
 
     # Prepare
     print("Preparing data...")
-    trade_dt = pd.to_datetime(df["TradDt"])
-    expiry_dt = pd.to_datetime(df["XpryDt"])
-    T_arr = ((expiry_dt - trade_dt).dt.days / 365.0).values.astype(np.float64)
-    mkt_price = df["SttlmPric"].fillna(df["ClsPric"]).values.astype(np.float64)
-    S = df["UndrlygPric"].values.astype(np.float64)
-    K = df["StrkPric"].values.astype(np.float64)
-    is_call = (df["OptnTp"] == "CE").values
-
-    df["Moneyness"] = S / K
-
-    # ── Build argument tuples ────────────────────────────────
-    print("Building IV solver arguments...")
-    all_args = list(zip(S, K, T_arr, [r]*len(df), [q]*len(df), mkt_price, is_call))
-
-    # Split into chunks for workers (reduce IPC overhead)
-    SUB_CHUNK = 5000  # rows per sub-task sent to a worker
-    chunks = [all_args[i:i+SUB_CHUNK] for i in range(0, len(all_args), SUB_CHUNK)]
-    print(f"  {len(chunks)} chunks of ~{SUB_CHUNK} rows each")
-
-    # ── Compute IV in parallel ───────────────────────────────
-    print(f"\nComputing IV with {N_WORKERS} workers...")
+    days = (df["XpryDt"].to_numpy() - df["TradDt"].to_numpy()).astype("timedelta64[D]")
+    T_arr = days.view(np.int64).astype(np.float64) / 365.0
+    T_arr[np.isnat(days)] = np.nan
+    # Each column is already a contiguous 1D buffer; to_numpy only copies on a dtype change
+    mkt_price = df["SttlmPric"].fillna(df["ClsPric"]).to_numpy(dtype=np.float64)
+    S = df["UndrlygPric"].to_numpy(dtype=np.float64)
+    K = df["StrkPric"].to_numpy(dtype=np.float64)
+    is_call = (df["OptnTp"] == "CE").to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):  # inf/NaN for zero strikes
+        df["Moneyness"] = S / K
+
+    # ── Compute IV (fused with the Greeks in the Numba kernel for large runs
+    #    if available, else vectorized NumPy) ──
+    print("\nComputing IV...")
     t_iv = time.time()
+    # Solve each distinct (S, K, T, price, type) once; repeated rows share the result
+    first, inverse = _distinct_rows(S, K, T_arr, mkt_price, is_call)
+    S_u, K_u, T_u, price_u, call_u = (a[first] for a in (S, K, T_arr, mkt_price, is_call))
+    n_u = len(S_u)
+    if n_u < len(df):
+        print(f"  {n_u:,} distinct rows to solve")
+    if njit is not None and n_u >= IV_NUMBA_MIN_ROWS:
+        iv_u = np.empty(n_u)
+        greeks_u = np.empty((len(GREEK_COLUMNS), n_u), dtype=DTYPE)  # one contiguous row per Greek
+        _iv_greeks_kernel(S_u, K_u, T_u, r, q, price_u, call_u,
+                          IV_LOWER, IV_UPPER, IV_XTOL, IV_MAXITER, iv_u, *greeks_u)
+    else:
+        iv_u = solve_iv_vectorized(S_u, K_u, T_u, r, q, price_u, call_u)
+        greeks_u = None
+    iv_arr = iv_u[inverse]
 
-    iv_arr = np.full(len(df), np.nan)
-    done = 0
-
-    with mp.Pool(N_WORKERS) as pool:
-        for i, result in enumerate(pool.imap(_solve_iv_chunk, chunks)):
-            start_idx = i * SUB_CHUNK
-            end_idx = start_idx + len(result)
-            iv_arr[start_idx:end_idx] = result
-            done += len(result)
-
-            # Progress every 10 chunks
-            if (i + 1) % 10 == 0 or done == len(df):
-                elapsed = time.time() - t_iv
-                speed = done / elapsed if elapsed > 0 else 0
-                eta = (len(df) - done) / speed if speed > 0 else 0
-                print(f"  {done:>10,} / {len(df):,} "
-                      f"| {elapsed:>6.1f}s "
-                      f"| {speed:>8,.0f} rows/s "
-                      f"| ETA: {eta/60:>5.1f} min")
-
-    df["IV"] = iv_arr
+    df["IV"] = iv_arr.astype(DTYPE)
     iv_time = time.time() - t_iv
     print(f"\nIV done in {iv_time:.1f}s ({iv_time/60:.1f} min)")
     print(f"  Valid IVs: {np.isfinite(iv_arr).sum():,} / {len(df):,}")
 
-    # ── Greeks (vectorized, near-instant) ────────────────────
-    print("\nComputing Greeks (vectorized)...")
-    t_g = time.time()
-    delta, gamma, vega, theta, rho = compute_greeks_vectorized(S, K, T_arr, r, q, iv_arr, is_call)
-    df["Delta"] = delta
-    df["Gamma"] = gamma
-    df["Vega"] = vega
-    df["Theta"] = theta
-    df["Rho"] = rho
-    print(f"Greeks computed in {time.time()-t_g:.1f}s")
+    # ── Greeks (vectorized, near-instant; the Numba kernel already made them) ──
+    if greeks_u is None:
+        print("\nComputing Greeks (vectorized)...")
+        t_g = time.time()
+        S_g, K_g, T_g, iv_g = (a.astype(DTYPE) for a in (S_u, K_u, T_u, iv_u))
+        greeks_u = np.stack(compute_greeks_vectorized(S_g, K_g, T_g, r, q, iv_g, call_u))
+        print(f"Greeks computed in {time.time()-t_g:.1f}s")
+    # Attach all five as one block: the transpose is the (ncols, nrows) layout pandas keeps
+    greeks = pd.DataFrame(greeks_u[:, inverse].T, columns=GREEK_COLUMNS, index=df.index, copy=False)
+    df = pd.concat([df, greeks], axis=1)
 
     # ── Summary ──────────────────────────────────────────────
     print("\n" + "=" * 60)
@@ -198,25 +440,29 @@ def main():
     greek_cols = ["IV", "Delta", "Gamma", "Vega", "Theta", "Rho", "Moneyness"]
     print(f"\n{'Col':<12} {'Valid':>10} {'NaN':>10} {'Mean':>12} {'Median':>12} {'Min':>12} {'Max':>12}")
     print("-" * 82)
+    # One NaN-skipping aggregation for all columns instead of a dropna() copy per column
+    stats = df[greek_cols].agg(["count", "mean", "median", "min", "max"])
     for col in greek_cols:
-        v = df[col].dropna()
-        n = df[col].isna().sum()
-        if len(v) > 0:
-            print(f"{col:<12} {len(v):>10,} {n:>10,} {v.mean():>12.6f} {v.median():>12.6f} {v.min():>12.6f} {v.max():>12.6f}")
+        count, mean, median, lo, hi = stats[col]
+        if count > 0:
+            print(f"{col:<12} {int(count):>10,} {len(df) - int(count):>10,} {mean:>12.6f} {median:>12.6f} {lo:>12.6f} {hi:>12.6f}")
 
     # Sanity
     print("\n  Sanity Checks:")
-    cd = df[df["OptnTp"]=="CE"]["Delta"].dropna()
-    pd_ = df[df["OptnTp"]=="PE"]["Delta"].dropna()
+    cd = df["Delta"][is_call]
+    pd_ = df["Delta"][(df["OptnTp"] == "PE").to_numpy()]
     print(f"    Call Delta: [{cd.min():.4f}, {cd.max():.4f}] (expect ~[0,1])")
     print(f"    Put Delta:  [{pd_.min():.4f}, {pd_.max():.4f}] (expect ~[-1,0])")
-    print(f"    Gamma >= 0: {(df['Gamma'].dropna() >= -1e-10).all()}")
-    print(f"    Vega >= 0:  {(df['Vega'].dropna() >= -1e-10).all()}")
+    print(f"    Gamma >= 0: {not (df['Gamma'] < -1e-10).any()}")
+    print(f"    Vega >= 0:  {not (df['Vega'] < -1e-10).any()}")
 
     # Save
     print(f"\nSaving to: {OUTPUT_FILE}")
     t_s = time.time()
-    df.to_csv(OUTPUT_FILE, index=False)
+    df.to_parquet(OUTPUT_FILE, engine="pyarrow", compression="zstd", index=False)
+    if WRITE_CSV:
+        print(f"Saving CSV copy to: {OUTPUT_CSV_FILE}")
+        df.to_csv(OUTPUT_CSV_FILE, index=False)
     print(f"Saved in {time.time()-t_s:.1f}s")
     total = time.time() - t0
     print(f"\nTotal time: {total/60:.1f} minutes")
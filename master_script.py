@@ -1,28 +1,63 @@
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import os
 import glob
+from concurrent.futures import ThreadPoolExecutor
 
 # Paths
 clean_dir = "D:/Antigravity/option_data/clean_data/"
 master_dir = "D:/Antigravity/option_data/master/"
+# Read by compute_greeks.py and calculate_vi_2024.py
+master_parquet = os.path.join(master_dir, "master_fo_data.parquet")
 master_file = os.path.join(master_dir, "master_fo_data.csv")
 
+# Set MASTER_CSV=1 to also export the master table as CSV
+WRITE_CSV = os.getenv("MASTER_CSV") == "1"
+
+# Declared types for the columns the downstream scripts use; the rest are inferred
+CSV_COLUMN_TYPES = {
+    "TradDt": pa.timestamp("ns"),
+    "XpryDt": pa.timestamp("ns"),
+    "TckrSymb": pa.string(),
+    "OptnTp": pa.string(),
+    "StrkPric": pa.float64(),
+    "UndrlygPric": pa.float64(),
+    "ClsPric": pa.float64(),
+    "SttlmPric": pa.float64(),
+}
+CSV_BATCH_ROWS = 1 << 18  # rows formatted per to_csv call in the CSV export
+MAX_WORKERS = min(8, os.cpu_count() or 1)  # files read concurrently
+
 os.makedirs(master_dir, exist_ok=True)
 
 # Find all processed CSV files
 csv_files = sorted(glob.glob(os.path.join(clean_dir, "processed_fo*.csv")))
 print(f"Found {len(csv_files)} processed CSV files.\n")
 
-# Read and append all into a single DataFrame
-all_dfs = []
-for i, f in enumerate(csv_files, 1):
-    basename = os.path.basename(f)
-    df = pd.read_csv(f)
-    all_dfs.append(df)
-    print(f"[{i}/{len(csv_files)}] Loaded {basename} — {len(df)} rows")
-
-# Concatenate and save
-master_df = pd.concat(all_dfs, ignore_index=True)
-master_df.to_csv(master_file, index=False)
-print(f"\nMaster file saved: {master_file}")
-print(f"Total rows: {len(master_df)}, Columns: {len(master_df.columns)}")
+
+def read_clean_file(path):
+    """Read one processed CSV as an Arrow table (the parse runs outside the GIL)."""
+    return pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(column_types=CSV_COLUMN_TYPES))
+
+
+# Read every file as an Arrow table, several files at a time, keeping input order
+tables = []
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+    for i, (f, table) in enumerate(zip(csv_files, ex.map(read_clean_file, csv_files)), 1):
+        tables.append(table)
+        print(f"[{i}/{len(csv_files)}] Loaded {os.path.basename(f)} — {table.num_rows} rows")
+
+# Concatenate and save. Arrow chains the per-file chunks instead of copying
+# them into a new buffer; columns missing from a file become nulls and
+# differing types are promoted, as pd.concat did.
+master = pa.concat_tables(tables, promote_options="permissive")
+del tables
+pq.write_table(master, master_parquet, compression="zstd")
+print(f"\nMaster file saved: {master_parquet}")
+if WRITE_CSV:
+    with open(master_file, "w", newline="", encoding="utf-8") as out:
+        for k, batch in enumerate(master.to_batches(max_chunksize=CSV_BATCH_ROWS)):
+            batch.to_pandas().to_csv(out, header=(k == 0), index=False)
+    print(f"CSV copy saved: {master_file}")
+print(f"Total rows: {master.num_rows}, Columns: {master.num_columns}")
@@ -0,0 +1,91 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "VI_data_extraction"))
+import calculate_vi_2024 as vi  # noqa: E402
+
+R = vi.RISK_FREE_RATE
+
+
+def _deep_itm_contract(day2_price):
+    """One deep ITM call quoted on two days; day 1 at sigma 0.4 warm-starts day 2."""
+    S = np.array([1000.0, 1000.0])
+    K = np.array([780.0, 780.0])
+    T = np.array([31.0, 30.0]) / 365.0
+    is_call = np.array([True, True])
+    day1_price = vi.bs_price(0.4, S[:1], K[:1], T[:1], R, 1.0)[0]
+    market_price = np.array([day1_price, day2_price])
+    sigma_cold = np.full(2, 0.4)
+    group_starts = np.array([0, 2])
+    return market_price, S, K, T, is_call, sigma_cold, group_starts
+
+
+def _intrinsic(S, K, T):
+    return S - K * np.exp(-R * T)
+
+
+def _solvers():
+    yield pytest.param(vi.warm_start_iv, id="numpy")
+    if vi.njit is not None:
+        def kernel(market_price, S, K, T, r, is_call, sigma_cold, group_starts):
+            out = np.empty(len(market_price))
+            vi._iv_kernel(market_price, S, K, T, r, is_call, sigma_cold, group_starts, out)
+            return out
+        yield pytest.param(kernel, id="numba")
+
+
+@pytest.mark.parametrize("solve", list(_solvers()))
+def test_warm_start_does_not_stop_at_seed_deep_itm(solve):
+    S, K, T = 1000.0, 780.0, 30.0 / 365.0
+    price = vi.bs_price(0.2, np.array([S]), np.array([K]), np.array([T]), R, 1.0)[0]
+    args = _deep_itm_contract(price)
+
+    iv = solve(*args[:4], R, *args[4:])
+
+    assert iv[0] == pytest.approx(0.4, abs=1e-4)
+    assert iv[1] == pytest.approx(0.2, abs=1e-4)
+
+
+@pytest.mark.parametrize("solve", list(_solvers()))
+def test_warm_start_below_intrinsic_is_nan(solve):
+    below = _intrinsic(1000.0, 780.0, 30.0 / 365.0) - 0.5
+    args = _deep_itm_contract(below)
+
+    iv = solve(*args[:4], R, *args[4:])
+
+    assert np.isfinite(iv[0])
+    assert np.isnan(iv[1])
+
+
+def test_compute_iv_below_intrinsic_is_nan():
+    below = _intrinsic(1000.0, 780.0, 30.0 / 365.0) - 0.5
+    market_price, S, K, T, is_call, _, group_starts = _deep_itm_contract(below)
+
+    iv, unconverged, rescued = vi.compute_iv(market_price, S, K, T, R, is_call, group_starts)
+
+    assert iv[0] == pytest.approx(0.4, abs=1e-4)
+    assert np.isnan(iv[1])
+    assert unconverged == rescued == 0
+
+
+def test_compute_iv_matches_bs_round_trip():
+    rng = np.random.default_rng(0)
+    n = 200
+    S = np.full(n, 1000.0)
+    K = rng.uniform(700.0, 1300.0, n)
+    T = rng.uniform(2.0, 90.0, n) / 365.0
+    is_call = rng.random(n) < 0.5
+    sigma = rng.uniform(0.1, 0.8, n)
+    market_price = vi.bs_price(sigma, S, K, T, R, np.where(is_call, 1.0, -1.0))
+    # Keep rows with enough time value to pin sigma down
+    keep = market_price - np.maximum(np.where(is_call, 1.0, -1.0) * _intrinsic(S, K, T), 0) > 1e-2
+    market_price, S, K, T, is_call, sigma = (a[keep] for a in
+                                             (market_price, S, K, T, is_call, sigma))
+    group_starts = np.arange(len(market_price) + 1)
+
+    iv, _, _ = vi.compute_iv(market_price, S, K, T, R, is_call, group_starts)
+
+    np.testing.assert_allclose(iv, sigma, atol=1e-4)